@@ -0,0 +1,90 @@
+"""
+tool_call_parser 基准测试: 在不同长度的合成响应上比较旧正则与单次扫描的耗时，验证线性时间
+
+运行: python benchmarks/bench_tool_call_parser.py
+"""
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mcp_chatbot.chat.tool_call_parser import extract_tool_calls, is_tool_call_dict  # noqa: E402
+
+LEGACY_PATTERN = re.compile(r"({[^{}]*({[^{}]*})*[^{}]*})")
+
+
+def legacy_extract(text: str) -> List[Dict[str, Any]]:
+    results = []
+    for match in LEGACY_PATTERN.finditer(text):
+        try:
+            obj = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            continue
+        if is_tool_call_dict(obj):
+            results.append(obj)
+    return results
+
+
+def build_reply(n_blocks: int) -> str:
+    block = (
+        "根据你的问题，我需要查询以下信息（注意 {花括号} 只是普通文本）。\n"
+        "```json\n"
+        '{"tool": "get_weather", "arguments": {"location": "北京", '
+        '"options": {"unit": "c", "extra": {"note": "含有 } 和 { 的字符串"}}}}\n'
+        "```\n"
+    )
+    return block * n_blocks
+
+
+def build_pathological(n_chars: int) -> str:
+    # 未闭合的 "{" 后跟大量非花括号字符: 旧正则在两个 [^{}]* 之间反复回溯，耗时随长度平方增长
+    return "{" + "a" * n_chars
+
+
+def build_unclosed_objects(n_chars: int) -> str:
+    # 大量未闭合的 JSON 对象，每个对象都要重新查找，内层对象复用已扫描的结果
+    return '{"a": ' * (n_chars // 6)
+
+
+def bench(func, text: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def main() -> None:
+    print("合成响应（每块含一个嵌套参数的工具调用）")
+    print(f"{'chars':>10} {'calls(new)':>10} {'calls(old)':>10} {'new(ms)':>10} {'ns/char':>8} {'old(ms)':>10}")
+    for n_blocks in (10, 100, 1000, 10000):
+        text = build_reply(n_blocks)
+        new_time = bench(extract_tool_calls, text)
+        old_time = bench(legacy_extract, text)
+        print(
+            f"{len(text):>10} {len(extract_tool_calls(text)):>10} {len(legacy_extract(text)):>10} "
+            f"{new_time * 1000:>10.2f} {new_time / len(text) * 1e9:>8.1f} {old_time * 1000:>10.2f}"
+        )
+
+    for title, build in (
+        ("未闭合的花括号后跟大量文本（旧正则回溯）", build_pathological),
+        ("大量未闭合的 JSON 对象（验证重新查找不会退化为平方复杂度）", build_unclosed_objects),
+    ):
+        print(f"\n{title}")
+        print(f"{'chars':>10} {'new(ms)':>10} {'ns/char':>8} {'old(ms)':>10}")
+        for n_chars in (1000, 2000, 4000, 8000):
+            text = build(n_chars)
+            new_time = bench(extract_tool_calls, text)
+            old_time = bench(legacy_extract, text, repeat=1)
+            print(
+                f"{len(text):>10} {new_time * 1000:>10.2f} {new_time / len(text) * 1e9:>8.1f} "
+                f"{old_time * 1000:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
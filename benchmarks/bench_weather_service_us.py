@@ -0,0 +1,118 @@
+"""
+weather_service_us 基准测试: 使用本地模拟的 NWS API（每个请求延迟 30ms），比较
+旧实现（每次请求新建 AsyncClient、无缓存）与共享连接池 + TTL/LRU 缓存的耗时
+
+运行: python benchmarks/bench_weather_service_us.py
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "services"))
+import weather_service_us as weather  # noqa: E402
+
+PORT = 8765
+BASE = f"http://127.0.0.1:{PORT}"
+LATENCY = 0.03
+CALLS = 50
+
+
+async def points(request: Request) -> JSONResponse:
+    await asyncio.sleep(LATENCY)
+    return JSONResponse({"properties": {"forecast": f"{BASE}/gridpoints/X/1,1/forecast"}})
+
+
+async def forecast(request: Request) -> JSONResponse:
+    await asyncio.sleep(LATENCY)
+    period = {
+        "name": "Tonight",
+        "temperature": 50,
+        "temperatureUnit": "F",
+        "windSpeed": "5 mph",
+        "windDirection": "N",
+        "detailedForecast": "Clear",
+    }
+    return JSONResponse({"properties": {"periods": [period] * 5}})
+
+
+def start_stub_server() -> None:
+    """ 在后台线程中启动模拟的 NWS API
+    """
+    app = Starlette(routes=[
+        Route("/points/{point}", points),
+        Route("/gridpoints/X/1,1/forecast", forecast),
+    ])
+    server = uvicorn.Server(uvicorn.Config(app, port=PORT, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+async def legacy_forecast(latitude: float, longitude: float) -> None:
+    """ 旧实现: 每次请求新建 AsyncClient，不缓存
+    """
+    async def request(url: str) -> dict:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url, headers={"User-Agent": weather.USER_AGENT}, timeout=30.0)
+            return response.json()
+
+    points_data = await request(f"{BASE}/points/{latitude},{longitude}")
+    await request(points_data["properties"]["forecast"])
+
+
+class StubContext:
+    """ 只提供 request_context.lifespan_context 的 Context 替身
+    """
+    def __init__(self, nws: weather.NWSClient):
+        self.request_context = type("RequestContext", (), {"lifespan_context": nws})()
+
+
+async def main() -> None:
+    weather.NWS_API_BASE = BASE
+    forecast_url = f"{BASE}/gridpoints/X/1,1/forecast"
+
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        await legacy_forecast(39.7456, -97.0892)
+    print(f"旧实现（新建连接，无缓存）:     {(time.perf_counter() - start) / CALLS * 1000:7.2f} ms/次")
+
+    async with weather.nws_lifespan(None) as nws:
+        ctx = StubContext(nws)
+
+        start = time.perf_counter()
+        await weather.get_forecast(39.7456, -97.0892, ctx)
+        print(f"新实现首次调用:                 {(time.perf_counter() - start) * 1000:7.2f} ms")
+
+        start = time.perf_counter()
+        for i in range(CALLS):
+            await weather.get_forecast(39.74561 + i * 1e-6, -97.0892, ctx)
+        print(f"新实现缓存命中（相近坐标）:     {(time.perf_counter() - start) / CALLS * 1000:7.2f} ms/次")
+
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            nws.cache.pop(forecast_url, None)
+            await weather.get_forecast(39.7456, -97.0892, ctx)
+        print(f"新实现 points 命中、预报过期:   {(time.perf_counter() - start) / CALLS * 1000:7.2f} ms/次")
+
+        # 大量不同坐标: 缓存大小不超过 max_entries
+        nws.max_entries = 100
+        await asyncio.gather(*[
+            weather.get_forecast(30 + i * 0.01, -97.0892, ctx) for i in range(300)
+        ])
+        print(f"300 个不同坐标后的缓存条目数:   {len(nws.cache):7d}（上限 {nws.max_entries}）")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    start_stub_server()
+    asyncio.run(main())
@@ -1,5 +1,10 @@
 from .config.configuration import Configuration
 from .chat.chat_session import ChatSession
+from .chat.tool_executor import ToolExecutor
+from .chat.conversation_memory import ConversationMemory
 from .llm.llm_service import LLMService
 from .mcp.mcp_client import MCPClient
-from .mcp.mcp_tool import MCPTool
\ No newline at end of file
+from .mcp.mcp_tool import MCPTool
+from .mcp.tool_cache import ToolResultCache
+from .mcp.capability_snapshot import CapabilitySnapshot
+from .server.session_manager import SessionManager, AdmissionError
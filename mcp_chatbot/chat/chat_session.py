@@ -1,14 +1,17 @@
 import asyncio
 import json
 import sys
-import re
+import time
 from dataclasses import dataclass
 from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union
 
 
 from ..mcp.mcp_client import MCPClient
 from ..llm.llm_service import LLMService
-# from ..mcp.mcp_tool import MCPTool
+from ..mcp.mcp_tool import MCPTool
+from .tool_executor import ToolExecutor
+from .conversation_memory import ConversationMemory
+from .tool_call_parser import ToolCallStreamParser, extract_tool_calls
 
 SYSTEM_PROMPT = (
     "你是一个可以使用以下工具的有用助手:\n\n"
@@ -31,6 +34,19 @@ SYSTEM_PROMPT = (
     "请仅使用上述明确定义的工具。"
 )
 
+NATIVE_SYSTEM_PROMPT = (
+    "你是一个有用的助手，可以通过函数调用使用已提供的工具。\n"
+    "根据用户的问题选择合适的工具，如果不需要工具，请直接回复。\n\n"
+    "在收到工具响应后：\n"
+    "1. 将原始数据转换为自然、对话式的回复\n"
+    "2. 保持回复简洁但信息丰富\n"
+    "3. 专注于最相关的信息\n"
+    "4. 使用用户问题中的适当上下文\n"
+    "5. 避免简单重复原始数据"
+)
+
+TOOL_CALL_MODES = ("prompt", "native")
+
 @dataclass
 class ToolCall:
     """ 工具调用数据类
@@ -71,6 +87,16 @@ class ToolCall:
             final_description += f"- Tool call error: {error_str}\n"
         return final_description
 
+    def result_text(self) -> str:
+        """ 工具调用结果的文本内容，失败时返回错误信息
+        """
+        if not self.is_successful():
+            return f"Error: {self.error}"
+        content = getattr(self.result, "content", None)
+        if isinstance(content, list):
+            return "\n".join(getattr(item, "text", str(item)) for item in content)
+        return str(self.result)
+
 class ChatSession:
     """ 聊天会话类，协调用户、LLM和工具之间的交互
     """
@@ -78,48 +104,168 @@ class ChatSession:
         self,
         clients: list[MCPClient],
         llm_service: LLMService,
+        startup_timeout: float = 30.0,
+        allow_partial_startup: bool = True,
+        max_tool_concurrency: int = 8,
+        max_tool_concurrency_per_server: int = 4,
+        max_context_tokens: int = 16000,
+        keep_recent_messages: int = 6,
+        tool_call_mode: str = "prompt",
+        owns_clients: bool = True,
+        server_semaphores: Optional[Dict[str, asyncio.Semaphore]] = None,
     ):
+        """
+        Args:
+            clients: MCP 服务器列表
+            llm_service: LLM 服务
+            startup_timeout: 单个服务器启动（连接 + 获取工具列表）超时时间（秒），
+                可在服务器配置中通过 "startupTimeout" 单独覆盖
+            allow_partial_startup: 是否允许部分服务器启动失败，
+                为 True 时会话仅使用启动成功的服务器
+            max_tool_concurrency: 同一轮工具调用的全局最大并发数
+            max_tool_concurrency_per_server: 单个服务器的默认最大并发数，
+                可在服务器配置中通过 "maxConcurrency" 单独覆盖
+            max_context_tokens: 对话历史的 token 预算，超出时压缩较早的对话
+            keep_recent_messages: 压缩时始终保留的最近消息条数
+            tool_call_mode: 工具调用方式，"prompt" 为在系统提示词中描述工具并解析 JSON 回复，
+                "native" 为使用 LLM 原生的 function calling
+            owns_clients: 会话是否负责服务器的生命周期；为 False 时服务器由外部（如多会话服务）
+                启动与关闭，会话结束时不会清理服务器
+            server_semaphores: 多个会话共享的服务器并发信号量
+        """
+        if tool_call_mode not in TOOL_CALL_MODES:
+            raise ValueError(f"不支持的工具调用方式: {tool_call_mode}，可选: {TOOL_CALL_MODES}")
         self.clients = clients
+        self.owns_clients = owns_clients
         self.llm_service = llm_service 
-        self.messages: List[Dict[str, str]] = []
+        self.memory = ConversationMemory(
+            max_tokens=max_context_tokens,
+            keep_recent_messages=keep_recent_messages,
+        )
         self.is_initialized: bool = False
-        self.tool_client_map = {}
+        # 工具名称 -> 服务器索引，工具路由为 O(1) 查找
+        self.tool_client_map: Dict[str, MCPClient] = {}
+        self.tool_call_mode = tool_call_mode
+        # 当前可用工具及其 OpenAI function calling 格式
+        self.tools: List[MCPTool] = []
+        self.openai_tools: List[Dict[str, Any]] = []
+        self.startup_timeout = startup_timeout
+        self.allow_partial_startup = allow_partial_startup
+        # 启动成功的服务器
+        self.active_clients: List[MCPClient] = []
+        # {server_name: 启动耗时(秒)}
+        self.startup_times: Dict[str, float] = {}
+        # {server_name: 失败原因}
+        self.failed_clients: Dict[str, str] = {}
+        self.tool_executor = ToolExecutor(
+            execute_fn=self._execute_tool_call,
+            resolve_client=lambda tool_name: self.tool_client_map.get(tool_name),
+            max_concurrency=max_tool_concurrency,
+            max_per_server=max_tool_concurrency_per_server,
+            server_semaphores=server_semaphores,
+        )
+        # 工具列表刷新任务，保留引用避免被回收
+        self._refresh_tasks: set = set()
+        for client in self.clients:
+            client.add_change_listener(self._on_catalog_changed)
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """ 当前对话历史（已按 token 预算压缩）
+        """
+        return self.memory.messages
 
     async def cleanup_clients(self) -> None:
-        """ 清理所有服务器
+        """ 清理所有服务器，服务器不归会话所有时仅解除监听
         """
+        for client in self.clients:
+            client.remove_change_listener(self._on_catalog_changed)
+        for task in self._refresh_tasks:
+            task.cancel()
+        if not self.owns_clients:
+            return
         await asyncio.gather(
             *[asyncio.create_task(client.cleanup()) for client in self.clients],
             return_exceptions=True
         )
 
+    async def _start_client(self, client: MCPClient) -> List[MCPTool]:
+        """ 启动单个服务器并获取工具列表，记录启动耗时；
+        已知工具列表时（按需启动（"lazy"，默认关闭）的服务器的能力快照，或共享服务器空闲停止后保留的缓存）
+        不启动进程，进程在第一次工具调用时才启动
+
+        Args:
+            client: MCP 服务器
+        Returns:
+            List[MCPTool]: 服务器的工具列表
+        """
+        if client.lazy and client.session is None and client._tools is None:
+            client.load_snapshot()
+        if client.session is None and client._tools is not None:
+            self.startup_times[client.name] = 0.0
+            print(f"[SYS]: 服务器 {client.name} 使用已知的工具列表，首次调用工具时启动")
+            return await client.list_tools()
+        timeout = client.config.get("startupTimeout", self.startup_timeout)
+        start_time = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout):
+                # 未运行时经 _ensure_started 启动：共享服务器被多个会话同时初始化时只启动一次
+                tools = await client.list_tools()
+        except TimeoutError:
+            if self.owns_clients:
+                await client.cleanup()
+            raise TimeoutError(f"启动超时（{timeout}s）")
+        except Exception:
+            if self.owns_clients:
+                await client.cleanup()
+            raise
+        finally:
+            self.startup_times[client.name] = time.perf_counter() - start_time
+        return tools
+
     async def initialize(self) -> bool:
         """ MCP 初始化
 
+        并发启动所有服务器并获取工具列表；允许部分失败时，
+        会话仅使用启动成功的服务器，失败原因记录在 failed_clients 中
         """
         try:
             if self.is_initialized:
                 return True
+            results = await asyncio.gather(
+                *[self._start_client(client) for client in self.clients],
+                return_exceptions=True
+            )
+
             all_tools = []
             all_tools_name = []
-            for client in self.clients:
-                await client.initialize()
-                tools = await client.list_tools()
-                all_tools.extend(tools)
-                for tool in tools:
+            self.active_clients = []
+            self.failed_clients = {}
+            for client, result in zip(self.clients, results):
+                cost = self.startup_times.get(client.name, 0.0)
+                if isinstance(result, BaseException):
+                    self.failed_clients[client.name] = str(result) or type(result).__name__
+                    print(f"[ERR]: 服务器 {client.name} 启动失败（耗时 {cost:.2f}s）: {result}")
+                    continue
+                print(f"[SYS]: 服务器 {client.name} 启动成功（耗时 {cost:.2f}s）")
+                self.active_clients.append(client)
+                all_tools.extend(result)
+                for tool in result:
                     self.tool_client_map[tool.name] = client
                     all_tools_name.append(tool.name)
-                
+
+            if not self.active_clients and self.clients:
+                raise RuntimeError("所有服务器均启动失败")
+            if self.failed_clients and not self.allow_partial_startup:
+                raise RuntimeError(f"部分服务器启动失败: {list(self.failed_clients)}")
+
             print(f"[SYS]: 可用工具: {all_tools_name}")
             print(f"[SYS]: 可用工具: {self.tool_client_map}")
 
-            tools_descriptions = "\n".join([tool.format_for_llm() for tool in all_tools])
-
-            system_message = SYSTEM_PROMPT.format(tools_descriptions=tools_descriptions)
+            self._set_tools(all_tools)
+            system_message = self._build_system_message(all_tools)
             
-            self.messages = [
-                {"role": "system", "content": system_message}
-            ]    
+            self.memory.reset(system_message)
             
             self.is_initialized = True
             return True
@@ -128,38 +274,54 @@ class ChatSession:
             await self.cleanup_clients()
             return False
         
-    def _extract_tool_dict(self, llm_response: str) -> List[Dict[str, Any]]:
-        """ 从 LLM 的响应中提取工具调用
+    def _set_tools(self, tools: List[MCPTool]) -> None:
+        """ 更新可用工具列表
+        """
+        self.tools = tools
+        self.openai_tools = [tool.to_openai_tool() for tool in tools]
+
+    def _build_system_message(self, tools: List[MCPTool]) -> str:
+        """ 根据工具列表生成系统提示词，原生工具调用模式下工具通过 tools 参数传递
+        """
+        if self.tool_call_mode == "native":
+            return NATIVE_SYSTEM_PROMPT
+        tools_descriptions = "\n".join([tool.format_for_llm() for tool in tools])
+        return SYSTEM_PROMPT.format(tools_descriptions=tools_descriptions)
+
+    def _on_catalog_changed(self, client: MCPClient, kind: str) -> None:
+        """ 服务器工具列表变更回调，后台刷新工具索引和系统提示词
+        """
+        if kind != "tools" or not self.is_initialized or client not in self.active_clients:
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh_client_tools(client))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh_client_tools(self, client: MCPClient) -> None:
+        """ 重新获取服务器工具列表，更新工具索引和系统提示词
         """
         try:
-            tool_dict = json.loads(llm_response)
-            if (
-                isinstance(tool_dict, dict)
-                and "tool" in tool_dict
-                and "arguments" in tool_dict
-            ):
-                return [tool_dict]
-        except json.JSONDecodeError:
-            pass
-        # Try to extract all JSON objects from the response
-        tool_dict = []
-        # Regex pattern to match JSON objects
-        json_pattern = r"({[^{}]*({[^{}]*})*[^{}]*})"
-        json_matches = re.finditer(json_pattern, llm_response)
-
-        for match in json_matches:
-            try:
-                json_obj = json.loads(match.group(0))
-                if (
-                    isinstance(json_obj, dict)
-                    and "tool" in json_obj
-                    and "arguments" in json_obj
-                ):
-                    tool_dict.append(json_obj)
-            except json.JSONDecodeError:
-                continue
+            tools = await client.list_tools()
+        except Exception as e:
+            print(f"[ERR]: 刷新服务器 {client.name} 工具列表失败: {e}")
+            return
+        for tool_name in [name for name, c in self.tool_client_map.items() if c is client]:
+            del self.tool_client_map[tool_name]
+        for tool in tools:
+            self.tool_client_map[tool.name] = client
+
+        # 其他服务器的工具列表均已缓存，不会产生额外请求
+        all_tools = []
+        for active_client in self.active_clients:
+            all_tools.extend(await active_client.list_tools())
+        self._set_tools(all_tools)
+        self.memory.set_system(self._build_system_message(all_tools))
+        print(f"[SYS]: 服务器 {client.name} 工具列表已更新: {[tool.name for tool in tools]}")
 
-        return tool_dict
+    def _extract_tool_dict(self, llm_response: str) -> List[Dict[str, Any]]:
+        """ 从 LLM 的响应中提取工具调用（单次扫描，支持代码块、多个调用和嵌套参数）
+        """
+        return extract_tool_calls(llm_response)
     
     async def _execute_tool_call(self, tool_call_data: Dict[str, Any]) -> ToolCall:
         """ 执行工具调用
@@ -201,10 +363,8 @@ class ChatSession:
         if not tool_call_data_list:
             return [], False
         
-        tool_calls = []
-        for tool_call_data in tool_call_data_list:
-            tool_call = await self._execute_tool_call(tool_call_data)
-            tool_calls.append(tool_call)
+        # 并发执行，结果顺序与调用顺序一致
+        tool_calls = await self.tool_executor.execute(tool_call_data_list)
 
         return tool_calls, True
     
@@ -226,6 +386,41 @@ class ChatSession:
             tool_str_list.append(tool_str)
         return "Tool execution results:\n\n" + "\n".join(tool_str_list)
     
+    @staticmethod
+    def _parse_native_tool_call(native_tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        """ 将原生工具调用转换为 {"tool": ..., "arguments": ...} 格式
+        """
+        function = native_tool_call["function"]
+        try:
+            arguments = json.loads(function["arguments"] or "{}")
+        except json.JSONDecodeError:
+            arguments = {"input": function["arguments"]}
+        return {"tool": function["name"], "arguments": arguments}
+
+    @staticmethod
+    def _tool_call_events(tool_call_data: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """ 工具调用开始执行时的流式事件
+        """
+        return [
+            ("tool_call", tool_call_data["tool"]),
+            ("tool_arguments", json.dumps(tool_call_data["arguments"])),
+            ("tool_execution", f"Executing tool {tool_call_data['tool']} ..."),
+        ]
+
+    @staticmethod
+    def _tool_result_event(idx: int, tool_call: ToolCall) -> Tuple[str, str]:
+        """ 工具调用完成时的流式事件
+        """
+        success = tool_call.is_successful()
+        return ("tool_result", json.dumps({
+            "index": idx,
+            "tool": tool_call.tool,
+            "success": success,
+            "result": str(tool_call.result)
+            if success
+            else str(tool_call.error),
+        }))
+
     async def get_llm_response_with_tool_call(
         self,
         user_input_msg: str,
@@ -245,15 +440,18 @@ class ChatSession:
             if not success:
                 return "Failed to initialize chat session"
             
-        self.messages.append({"role": "user", "content": user_input_msg})
+        self.memory.append({"role": "user", "content": user_input_msg})
 
         print("[LOG]: LLM is processing your request...")
 
-        llm_response = self.llm_service.get_response(
+        if self.tool_call_mode == "native":
+            return await self._get_native_response(is_process_tools, max_iters)
+
+        llm_response = await self.llm_service.get_response(
             messages=self.messages,
             stream=False
         )
-        self.messages.append({"role": "assistant", "content": llm_response})
+        self.memory.append({"role": "assistant", "content": llm_response})
         print(f"[LOG]: LLM Response: {llm_response}")
 
         if not is_process_tools:
@@ -271,19 +469,47 @@ class ChatSession:
                 print(f"[LOG]: Tool Call {i}: tool_name: {tool_call.tool}, arguments: {tool_call.arguments}")
             
             tool_results = self._format_tool_result(tool_calls)
-            self.messages.append({"role": "system", "content": tool_results})
+            self.memory.append({"role": "system", "content": tool_results})
             # 下一次模型生成
-            llm_next_response = self.llm_service.get_response(
+            llm_response = await self.llm_service.get_response(
                 messages=self.messages,
                 stream=False
             )
-            print(f"[LOG]: LLM Next Response: {llm_next_response}")
-            self.messages.append({"role": "assistant", "content": llm_next_response})
+            print(f"[LOG]: LLM Next Response: {llm_response}")
+            self.memory.append({"role": "assistant", "content": llm_response})
 
-            # 检查是否存在函数调用
-            next_tool_calls_data =self._extract_tool_dict(llm_next_response)
-            if not next_tool_calls_data:
-                return llm_next_response
+        return llm_response
+
+    async def _get_native_response(self, is_process_tools: bool, max_iters: int) -> str:
+        """ 原生工具调用模式：循环执行模型返回的 tool_calls，直到模型给出最终回复
+        """
+        tool_iter = 0
+        while True:
+            tools = self.openai_tools if is_process_tools and tool_iter < max_iters else []
+            message = await self.llm_service.get_tool_call_response(
+                messages=self.messages,
+                tools=tools,
+                stream=False
+            )
+            self.memory.append(message)
+            print(f"[LOG]: LLM Response: {message}")
+
+            native_tool_calls = message.get("tool_calls")
+            if not native_tool_calls:
+                return message["content"] or ""
+
+            tool_calls = await self.tool_executor.execute(
+                [self._parse_native_tool_call(call) for call in native_tool_calls]
+            )
+            for native_tool_call, tool_call in zip(native_tool_calls, tool_calls):
+                print(f"[LOG]: Tool Call: tool_name: {tool_call.tool}, arguments: {tool_call.arguments}")
+                self.memory.append({
+                    "role": "tool",
+                    "tool_call_id": native_tool_call["id"],
+                    "name": tool_call.tool,
+                    "content": tool_call.result_text(),
+                })
+            tool_iter += 1
 
     async def get_llm_response_stream_with_tool_call(
         self,
@@ -305,73 +531,135 @@ class ChatSession:
                 yield ("error", "Failed to initialize chat session")
                 return
         
-        self.messages.append({"role": "user", "content": user_input_msg})
+        self.memory.append({"role": "user", "content": user_input_msg})
 
         yield ("status", "Thinking...")
-        response_chunks = []
-        for chunk in self.llm_service.get_response(self.messages, stream=True):
-            response_chunks.append(chunk)
-            yield ("response", chunk)
-
-        llm_response = "".join(response_chunks)
-        self.messages.append({"role": "assistant", "content": llm_response})
+        if self.tool_call_mode == "native":
+            stream = self._stream_native_response(is_process_tools, max_iters)
+        else:
+            stream = self._stream_prompt_response(is_process_tools, max_iters)
+        async for event in stream:
+            yield event
 
-        if not is_process_tools:
-            return
-        
+    async def _stream_prompt_response(
+        self,
+        is_process_tools: bool,
+        max_iters: int
+    ) -> AsyncGenerator[Tuple[str, str], None]:
+        """ prompt 模式的流式响应与工具调用
+        """
         tool_iter = 0
-        while tool_iter < max_iters:
-            # 提取工具调用
-            tool_call_data_list = self._extract_tool_dict(llm_response)
-            if not tool_call_data_list:
-                return
-            
-            # 处理工具调用
-            tool_calls = []
-            for idx, tool_call_data in enumerate(tool_call_data_list):
-                tool_name = tool_call_data["tool"]
-                argments = tool_call_data["arguments"]
-
-                yield ("tool_call", tool_name)
-                yield ("tool_arguments", json.dumps(argments))
-
-                # 执行工具调用
-                yield ("tool_execution", f"Executing tool {tool_name} ...")
-                tool_call = await self._execute_tool_call(tool_call_data)
-                tool_calls.append(tool_call)
-                # 执行结果
-                success = tool_call.is_successful()
-                yield ("tool_result", json.dumps({
-                    "success": success,
-                    "result": str(tool_call.result)
-                    if success
-                    else str(tool_call.error),
-                }))
+        while True:
+            # 增量解析工具调用：JSON 闭合后立即执行，原始 JSON 不输出到 response
+            parse_tools = is_process_tools and tool_iter < max_iters
+            parser = ToolCallStreamParser()
+            response_chunks = []
+            tasks = []
+            try:
+                async for chunk in await self.llm_service.get_response(self.messages, stream=True):
+                    response_chunks.append(chunk)
+                    if not parse_tools:
+                        yield ("response", chunk)
+                        continue
+
+                    text, new_tool_calls = parser.feed(chunk)
+                    if text:
+                        yield ("response", text)
+                    for tool_call_data in new_tool_calls:
+                        tasks.append(self.tool_executor.submit(len(tasks), tool_call_data))
+                        for event in self._tool_call_events(tool_call_data):
+                            yield event
+
+                text = parser.flush()
+                if text:
+                    yield ("response", text)
+
+                llm_response = "".join(response_chunks)
+                self.memory.append({"role": "assistant", "content": llm_response})
+
+                if not tasks:
+                    return
+
+                # 按完成顺序返回执行结果
+                tool_calls: List[Optional[ToolCall]] = [None] * len(tasks)
+                for future in asyncio.as_completed(tasks):
+                    idx, tool_call = await future
+                    tool_calls[idx] = tool_call
+                    yield self._tool_result_event(idx, tool_call)
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
 
             # 格式化所有工具调用
             tool_results = self._format_tool_result(tool_calls)
-            self.messages.append({"role": "system", "content": tool_results})
+            self.memory.append({"role": "system", "content": tool_results})
+            tool_iter += 1
 
             # 下一次模型生成
             yield ("status", "Processing results...")
-            next_response_chunks = []
-            for chunk in self.llm_service.get_response(
-                messages=self.messages,
-                stream=True
-            ):
-                next_response_chunks.append(chunk)
-                yield ("response", chunk)
 
-            llm_next_response = "".join(next_response_chunks)
-            self.messages.append({"role": "assistant", "content": llm_next_response})
+    async def _stream_native_response(
+        self,
+        is_process_tools: bool,
+        max_iters: int
+    ) -> AsyncGenerator[Tuple[str, str], None]:
+        """ 原生工具调用模式的流式响应，每个工具调用参数完整后立即开始执行
+        """
+        tool_iter = 0
+        while True:
+            tools = self.openai_tools if is_process_tools and tool_iter < max_iters else []
+            content_chunks = []
+            native_tool_calls = []
+            tasks = []
+            try:
+                async for event, data in await self.llm_service.get_tool_call_response(
+                    messages=self.messages,
+                    tools=tools,
+                    stream=True
+                ):
+                    if event == "content":
+                        content_chunks.append(data)
+                        yield ("response", data)
+                        continue
+
+                    tool_call_data = self._parse_native_tool_call(data)
+                    tasks.append(self.tool_executor.submit(len(tasks), tool_call_data))
+                    native_tool_calls.append(data)
+                    for tool_event in self._tool_call_events(tool_call_data):
+                        yield tool_event
+
+                message: Dict[str, Any] = {
+                    "role": "assistant",
+                    "content": "".join(content_chunks) or None
+                }
+                if native_tool_calls:
+                    message["tool_calls"] = native_tool_calls
+                self.memory.append(message)
+
+                if not tasks:
+                    return
 
-            # 检查是否还存在工具调用
-            next_tool_calls_data =self._extract_tool_dict(llm_next_response)
-            if not next_tool_calls_data:
-                return
-            
+                tool_calls: List[Optional[ToolCall]] = [None] * len(tasks)
+                for future in asyncio.as_completed(tasks):
+                    idx, tool_call = await future
+                    tool_calls[idx] = tool_call
+                    yield self._tool_result_event(idx, tool_call)
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+
+            for native_tool_call, tool_call in zip(native_tool_calls, tool_calls):
+                self.memory.append({
+                    "role": "tool",
+                    "tool_call_id": native_tool_call["id"],
+                    "name": tool_call.tool,
+                    "content": tool_call.result_text(),
+                })
             tool_iter += 1
-        
+
+            yield ("status", "Processing results...")
 
     async def process_llm_response(self, llm_response: str) -> str:
         """ 处理 LLM 的响应，并执行工具调用
@@ -381,16 +669,16 @@ class ChatSession:
             tool_call = json.loads(llm_response)
             if "tool" in tool_call and "arguments" in tool_call:
                 # 查找对应服务器
-                for server in self.clients:
-                    if any(tool.name == tool_call["tool"] for tool in await server.list_tools()):
-                        result = await server.execute_tool(tool_call["tool"], tool_call["arguments"])
-
-                        # 处理进度信息
-                        if isinstance(result, dict) and "progress" in result:
-                            progress = (result["progress"] / result["total"]) * 100
-                            print(f"[LOG]: 进度: {progress:.1f}%")
-                        
-                        return f"工具执行结果: {result}"
+                server = self.tool_client_map.get(tool_call["tool"])
+                if server is not None:
+                    result = await server.execute_tool(tool_call["tool"], tool_call["arguments"])
+
+                    # 处理进度信息
+                    if isinstance(result, dict) and "progress" in result:
+                        progress = (result["progress"] / result["total"]) * 100
+                        print(f"[LOG]: 进度: {progress:.1f}%")
+                    
+                    return f"工具执行结果: {result}"
                         
                 return f"未找到工具: {tool_call['tool']}"
             return llm_response
@@ -402,77 +690,41 @@ class ChatSession:
         """ 主循环聊天
         """
         try:
-            # 初始化所有服务器
-            for server in self.clients:
-                try:
-                    await server.initialize()
-                except Exception as e:
-                    print(f"[ERR]: 初始化 server 失败: {e}")
-                    await self.cleanup_clients()
-                    return
-
-            # 收集所有工具信息
-            all_tools = []
-            all_tools_name = []
-            for server in self.clients:
-                tools = await server.list_tools()
-                all_tools.extend(tools)
-                all_tools_name.extend([tool.name for tool in tools])
-
-            print(f"[SYS]: 可用工具: {all_tools_name}")
-
-            tools_descriptions = "\n".join([tool.format_for_llm() for tool in all_tools])
+            # 并发初始化所有服务器
+            if not await self.initialize():
+                return
 
-            system_message = SYSTEM_PROMPT.format(tools_descriptions=tools_descriptions)
-            
-            messages = [
-                {"role": "system", "content": system_message}
-            ]
+            loop = asyncio.get_event_loop()
 
             while True:
-                user_input = input("\n[USR]: ").strip().lower()
+                # 使用run_in_executor处理同步输入，避免阻塞事件循环
+                user_input = await loop.run_in_executor(
+                    None,
+                    lambda: input("\n[USR]: ").strip()
+                )
                 print()
-                if user_input in ["quit", "exit"]:
+                if user_input.lower() in ["quit", "exit"]:
                     print("[SYS]: \n退出聊天")
                     break
+                if not user_input:
+                    continue
 
-                messages.append({"role": "user", "content": user_input})
-
-                # 获取LLM输出
-                llm_stream = self.llm_service.get_response(messages, stream=True)
-                # print(f"[LOG]: {llm_response}")
-                sys.stdout.write("[LOG]: ")
+                sys.stdout.write("[LLM]: ")
                 sys.stdout.flush()
-                llm_response = ""
-                for content_chunk in llm_stream:
-                    if content_chunk:
-                        sys.stdout.write(content_chunk)
+                async for event, data in self.get_llm_response_stream_with_tool_call(user_input):
+                    if event == "response":
+                        sys.stdout.write(data)
+                        sys.stdout.flush()
+                    elif event == "tool_execution":
+                        print(f"\n[LOG]: {data}")
+                    elif event == "tool_result":
+                        print(f"[LOG]: 工具结果: {data}")
+                    elif event == "status" and data != "Thinking...":
+                        sys.stdout.write("\n[LLM]: ")
                         sys.stdout.flush()
-                        llm_response += content_chunk
+                    elif event == "error":
+                        print(f"[ERR]: {data}")
                 print("\n")  # 流式输出结束后换行
-
-                # 工具调用
-                processed_result = await self.process_llm_response(llm_response)
-
-                # 处理
-                if processed_result != llm_response:
-                    messages.append({"role": "assistant", "content": llm_response})
-                    messages.append({"role": "system", "content": processed_result})
-                    
-                    llm_stream = self.llm_service.get_response(messages, stream=True)
-                    # print(f"[LLM]: {final_response}")
-                    sys.stdout.write("[LLM]: ")
-                    sys.stdout.flush()
-                    final_response = ""
-                    for content_chunk in llm_stream:
-                        if content_chunk:
-                            sys.stdout.write(content_chunk)
-                            sys.stdout.flush()
-                            final_response += content_chunk
-                    print("\n")  # 流式输出结束后换行
-
-                else:
-                    messages.append({"role": "assistant", "content": llm_response})
         
         finally:
-            await self.cleanup_clients()
\ No newline at end of file
+            await self.cleanup_clients()
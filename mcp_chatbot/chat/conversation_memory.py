@@ -0,0 +1,195 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# 中日韩字符及全角符号，约 1 个字符 1 个 token
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uac00-\ud7af\uff00-\uffef]")
+# 每条消息的固定开销（role、分隔符等）
+_MESSAGE_OVERHEAD = 4
+_TOOL_RESULT_PREFIX = "Tool execution results"
+_SUMMARY_PREFIX = "早期对话摘要（已压缩）:\n"
+
+
+class ConversationMemory:
+    """ 有界对话记忆
+
+    按消息记录 token 估算值，总量超过预算时压缩历史：
+    1. 截断较早的工具执行结果
+    2. 按轮次（以用户消息为界）丢弃最早的对话，并将用户问题写入摘要消息
+    3. 仍超出预算时，截断最近对话中的工具执行结果（最后一条消息除外）
+    系统提示词与最近 keep_recent_messages 条消息始终保留。
+    """
+    def __init__(
+        self,
+        max_tokens: int = 16000,
+        keep_recent_messages: int = 6,
+        max_tool_result_chars: int = 1000,
+        max_summary_chars: int = 1000,
+    ):
+        """
+        Args:
+            max_tokens: 对话历史的 token 预算
+            keep_recent_messages: 始终保留的最近消息条数
+            max_tool_result_chars: 较早工具执行结果截断后的最大字符数
+            max_summary_chars: 摘要消息的最大字符数
+        """
+        self.max_tokens = max_tokens
+        self.keep_recent_messages = keep_recent_messages
+        self.max_tool_result_chars = max_tool_result_chars
+        self.max_summary_chars = max_summary_chars
+        self.messages: List[Dict[str, Any]] = []
+        # 与 messages 一一对应的 token 估算值
+        self._tokens: List[int] = []
+        self._total_tokens: int = 0
+        self._has_system: bool = False
+        self._has_summary: bool = False
+
+    @staticmethod
+    def estimate_tokens(message: Dict[str, Any]) -> int:
+        """ 估算单条消息的 token 数：中日韩字符按 1 个 token，其余按 4 个字符 1 个 token
+        """
+        content = message.get("content")
+        if content is None:
+            text = ""
+        elif isinstance(content, str):
+            text = content
+        else:
+            text = json.dumps(content, ensure_ascii=False, default=str)
+        if message.get("tool_calls"):
+            text += json.dumps(message["tool_calls"], ensure_ascii=False, default=str)
+        cjk_count = len(_CJK_PATTERN.findall(text))
+        return cjk_count + (len(text) - cjk_count + 3) // 4 + _MESSAGE_OVERHEAD
+
+    @property
+    def total_tokens(self) -> int:
+        """ 当前对话历史的 token 估算总量
+        """
+        return self._total_tokens
+
+    def reset(self, system_content: Optional[str] = None) -> None:
+        """ 清空对话历史，可同时设置系统提示词
+        """
+        self.messages = []
+        self._tokens = []
+        self._total_tokens = 0
+        self._has_system = False
+        self._has_summary = False
+        if system_content is not None:
+            self._insert(0, {"role": "system", "content": system_content})
+            self._has_system = True
+
+    def set_system(self, system_content: str) -> None:
+        """ 设置或替换系统提示词
+        """
+        message = {"role": "system", "content": system_content}
+        if self._has_system:
+            self._replace(0, message)
+        else:
+            self._insert(0, message)
+            self._has_system = True
+        self.compact()
+
+    def append(self, message: Dict[str, Any]) -> None:
+        """ 追加消息，超出预算时自动压缩
+        """
+        self._insert(len(self.messages), message)
+        self.compact()
+
+    def compact(self) -> None:
+        """ 将对话历史压缩到预算以内
+        """
+        if self._total_tokens <= self.max_tokens:
+            return
+
+        # 1. 截断较早的工具执行结果
+        self._truncate_tool_outputs(self._head_size(), self._tail_start())
+
+        # 2. 按轮次丢弃最早的对话
+        while self._total_tokens > self.max_tokens:
+            head, tail_start = self._head_size(), self._tail_start()
+            if head >= tail_start:
+                break
+            end = head + 1
+            while end < tail_start and self.messages[end]["role"] != "user":
+                end += 1
+            # 不能在 assistant 的 tool_calls 与对应 tool 消息之间截断
+            if end < len(self.messages) and self.messages[end]["role"] == "tool":
+                break
+            dropped = self.messages[head:end]
+            for _ in range(end - head):
+                self._remove(head)
+            self._update_summary(dropped)
+
+        # 3. 仍超出预算时，截断保留区域内除最后一条消息外的工具执行结果
+        self._truncate_tool_outputs(self._head_size(), len(self.messages) - 1)
+
+    def _truncate_tool_outputs(self, start: int, end: int) -> None:
+        """ 截断 [start, end) 范围内的工具执行结果，直到满足预算
+        """
+        for index in range(start, end):
+            if self._total_tokens <= self.max_tokens:
+                return
+            message = self.messages[index]
+            if self._is_tool_output(message):
+                content = message["content"]
+                if len(content) > self.max_tool_result_chars:
+                    self._replace(index, {
+                        **message,
+                        "content": content[:self.max_tool_result_chars] + "\n...[结果已截断]"
+                    })
+
+    def _head_size(self) -> int:
+        """ 头部固定保留的消息数（系统提示词 + 摘要）
+        """
+        return int(self._has_system) + int(self._has_summary)
+
+    def _tail_start(self) -> int:
+        """ 尾部始终保留区域的起始下标
+        """
+        return max(self._head_size(), len(self.messages) - self.keep_recent_messages)
+
+    @staticmethod
+    def _is_tool_output(message: Dict[str, Any]) -> bool:
+        content = message.get("content")
+        if not isinstance(content, str):
+            return False
+        return message["role"] == "tool" or (
+            message["role"] == "system" and content.startswith(_TOOL_RESULT_PREFIX)
+        )
+
+    def _update_summary(self, dropped: List[Dict[str, Any]]) -> None:
+        """ 将被丢弃轮次中的用户问题写入摘要消息，摘要超长时保留最新部分
+        """
+        lines = [
+            f"- 用户: {message['content'][:100]}"
+            for message in dropped
+            if message["role"] == "user" and isinstance(message.get("content"), str)
+        ]
+        if not lines:
+            return
+        index = int(self._has_system)
+        previous = self.messages[index]["content"][len(_SUMMARY_PREFIX):] if self._has_summary else ""
+        body = (previous + "\n" + "\n".join(lines)).strip()[-self.max_summary_chars:]
+        message = {"role": "system", "content": _SUMMARY_PREFIX + body}
+        if self._has_summary:
+            self._replace(index, message)
+        else:
+            self._insert(index, message)
+            self._has_summary = True
+
+    def _insert(self, index: int, message: Dict[str, Any]) -> None:
+        tokens = self.estimate_tokens(message)
+        self.messages.insert(index, message)
+        self._tokens.insert(index, tokens)
+        self._total_tokens += tokens
+
+    def _replace(self, index: int, message: Dict[str, Any]) -> None:
+        tokens = self.estimate_tokens(message)
+        self._total_tokens += tokens - self._tokens[index]
+        self.messages[index] = message
+        self._tokens[index] = tokens
+
+    def _remove(self, index: int) -> None:
+        self._total_tokens -= self._tokens.pop(index)
+        del self.messages[index]
+
@@ -0,0 +1,282 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# 可能是 ```json 代码块起始标记的前缀
+_FENCE_PREFIX_PATTERN = re.compile(r"`{1,3}|```[A-Za-z]{0,16}\s{0,16}")
+# 完整的代码块起始标记，其后紧跟 "{" 时视为工具调用的一部分
+_FENCE_OPEN_PATTERN = re.compile(r"```[A-Za-z]{0,16}\s{0,16}")
+# JSON 结构字符，扫描时只在这些位置停留
+_STRUCTURAL_PATTERN = re.compile(r'[{}"\\]')
+# JSON 对象起始: "{" 后（跳过空白）紧跟 "键名": 或 "}"
+_OBJECT_START_PATTERN = re.compile(r'\{\s*(?:\}|"(?:[^"\\\n]|\\.)*"\s*:)')
+# JSON 对象中字符串之外允许出现的其他字符（数字、true/false/null、分隔符与空白）
+_JSON_VALUE_CHARS = frozenset(" \t\r\n[],:0123456789+-.eEtrufalsn")
+# 流式解析时单个 JSON 对象的最大长度，超过后按文本输出
+_MAX_OBJECT_CHARS = 64 * 1024
+
+
+def is_tool_call_dict(obj: Any) -> bool:
+    """ 判断是否为 {"tool": ..., "arguments": ...} 格式的工具调用
+    """
+    return isinstance(obj, dict) and "tool" in obj and "arguments" in obj
+
+
+def _scan_object(text: str, start: int) -> Tuple[int, Dict[int, int]]:
+    """ 从 start 处的 "{" 开始扫描，跟踪花括号深度与字符串/转义状态
+
+    Returns:
+        (闭合的 "}" 位置，未闭合为 -1, 扫描中经过的每个字符串外 "{" 的闭合位置)
+        从这些内层 "{" 重新扫描的结果与本次扫描一致，可直接复用
+    """
+    stack = [start]
+    closed: Dict[int, int] = {}
+    in_string = False
+    escaped_pos = -1
+    for match in _STRUCTURAL_PATTERN.finditer(text, start + 1):
+        pos = match.start()
+        char = match.group()
+        if in_string:
+            if pos == escaped_pos:
+                continue
+            if char == "\\":
+                escaped_pos = pos + 1
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char == "{":
+            stack.append(pos)
+        elif char == "}":
+            closed[stack.pop()] = pos
+            if not stack:
+                return pos, closed
+    for open_pos in stack:
+        closed[open_pos] = -1
+    return -1, closed
+
+
+def extract_tool_calls(text: str) -> List[Dict[str, Any]]:
+    """ 从完整的 LLM 响应中提取所有工具调用
+
+    跟踪花括号深度与字符串/转义状态扫描 JSON 对象，支持：
+    - ```json 代码块包裹
+    - 一条响应中的多个工具调用
+    - 任意层级嵌套的参数（字符串中的花括号不计入深度）
+    对象未闭合或无法解析时，从其 "{" 的下一个字符重新查找，之后的工具调用不会被遮挡；
+    重新扫描时复用已扫描过的内层对象的结果，只有位于未闭合字符串中的 "{" 需要再次扫描。
+
+    Args:
+        text: LLM 响应文本
+    Returns:
+        按出现顺序排列的工具调用列表
+    """
+    # 整条响应就是一个工具调用
+    stripped = text.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            obj = json.loads(stripped)
+            if is_tool_call_dict(obj):
+                return [obj]
+        except json.JSONDecodeError:
+            pass
+
+    tool_calls: List[Dict[str, Any]] = []
+    # "{" 位置 -> 闭合位置（-1 表示未闭合）
+    known_ends: Dict[int, int] = {}
+    pos = 0
+    while True:
+        # 顶层只关心 JSON 对象的起始位置
+        match = _OBJECT_START_PATTERN.search(text, pos)
+        if match is None:
+            return tool_calls
+        start = match.start()
+        end = known_ends.get(start)
+        if end is None:
+            end, closed = _scan_object(text, start)
+            known_ends.update(closed)
+        if end < 0:
+            pos = start + 1
+            continue
+        try:
+            obj = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            pos = start + 1
+            continue
+        if is_tool_call_dict(obj):
+            tool_calls.append(obj)
+        pos = end + 1
+
+
+class ToolCallStreamParser:
+    """ 增量工具调用解析器
+
+    逐块输入 LLM 的流式输出，按字符跟踪花括号深度与字符串状态：
+    - 顶层 JSON 对象闭合时立即解析，若为工具调用则返回，工具可在模型继续生成时开始执行
+    - 工具调用的原始 JSON（包括 ```json 代码块标记）不会出现在可显示文本中
+    - 非工具调用的 JSON 对象在闭合后原样作为文本输出
+    - 对象中出现 JSON 不允许的字符（字符串外的普通文字、字符串中的换行等）、超过 _MAX_OBJECT_CHARS
+      或闭合后无法解析时，"{" 按文本输出，其后的字符重新处理，之后的工具调用仍能识别
+    """
+    def __init__(self):
+        self._depth: int = 0
+        self._in_string: bool = False
+        self._escape: bool = False
+        # 当前对象是否已出现第一个非空白字符
+        self._object_started: bool = False
+        # 当前未闭合 JSON 对象的字符
+        self._object_chars: List[str] = []
+        # 顶层暂存的文本（可能是代码块起始标记）
+        self._pending: str = ""
+        # 当前 JSON 对象前的代码块起始标记
+        self._fence: str = ""
+        # 上一个工具调用之后，跳过空白与代码块结束标记
+        self._skip_closing_fence: bool = False
+
+    def feed(self, chunk: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """ 输入一段流式输出
+
+        Args:
+            chunk: 新的文本片段
+        Returns:
+            (可显示的文本, 本次新完成的工具调用列表)
+        """
+        text_parts: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        chars = chunk
+        i = 0
+        while i < len(chars):
+            char = chars[i]
+            i += 1
+            if self._depth == 0:
+                self._feed_text_char(char, text_parts)
+                continue
+            rest = self._feed_object_char(char, text_parts, tool_calls)
+            if rest is not None:
+                # 当前对象不是工具调用，重新处理 "{" 之后暂存的字符
+                chars = rest + chars[i:]
+                i = 0
+        return "".join(text_parts), tool_calls
+
+    def flush(self) -> str:
+        """ 流结束时返回所有暂存的文本（未闭合的 JSON 对象按文本处理）
+        """
+        text = self._pending + self._fence + "".join(self._object_chars)
+        self.__init__()
+        return text
+
+    def _feed_text_char(self, char: str, text_parts: List[str]) -> None:
+        """ 处理 JSON 对象之外的字符
+        """
+        if self._skip_closing_fence:
+            if char.isspace():
+                return
+            if char == "`" and len(self._pending) < 3:
+                self._pending += char
+                if self._pending == "```":
+                    self._pending = ""
+                    self._skip_closing_fence = False
+                return
+            self._skip_closing_fence = False
+
+        if char == "{":
+            if not self._pending or _FENCE_OPEN_PATTERN.fullmatch(self._pending):
+                self._fence = self._pending
+            else:
+                text_parts.append(self._pending)
+                self._fence = ""
+            self._pending = ""
+            self._depth = 1
+            self._object_started = False
+            self._object_chars = [char]
+            return
+
+        if self._pending or char == "`":
+            self._pending += char
+            if not _FENCE_PREFIX_PATTERN.fullmatch(self._pending):
+                text_parts.append(self._pending)
+                self._pending = ""
+            return
+
+        text_parts.append(char)
+
+    def _feed_object_char(
+        self,
+        char: str,
+        text_parts: List[str],
+        tool_calls: List[Dict[str, Any]]
+    ) -> Optional[str]:
+        """ 处理 JSON 对象内部的字符
+
+        Returns:
+            当前对象不可能是工具调用时，返回 "{" 之后需要重新处理的字符，否则返回 None
+        """
+        self._object_chars.append(char)
+        if not self._object_started and not char.isspace():
+            self._object_started = True
+            # 对象的第一个有效字符不是键名，不是 JSON 对象
+            if char not in '"}':
+                return self._abandon_object(text_parts)
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+            elif char < " ":
+                # JSON 字符串中不能出现未转义的控制字符（如换行）
+                return self._abandon_object(text_parts)
+        elif char == '"':
+            self._in_string = True
+        elif char == "{":
+            self._depth += 1
+        elif char == "}":
+            self._depth -= 1
+            if self._depth == 0:
+                return self._close_object(text_parts, tool_calls)
+        elif char not in _JSON_VALUE_CHARS:
+            return self._abandon_object(text_parts)
+
+        if len(self._object_chars) > _MAX_OBJECT_CHARS:
+            return self._abandon_object(text_parts)
+        return None
+
+    def _abandon_object(self, text_parts: List[str]) -> str:
+        """ 放弃当前对象: 代码块标记与 "{" 按文本输出，返回其后暂存的字符
+        """
+        text_parts.append(self._fence + self._object_chars[0])
+        rest = "".join(self._object_chars[1:])
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_started = False
+        self._object_chars = []
+        self._fence = ""
+        return rest
+
+    def _close_object(
+        self,
+        text_parts: List[str],
+        tool_calls: List[Dict[str, Any]]
+    ) -> Optional[str]:
+        """ 顶层 JSON 对象闭合，判断是否为工具调用，无法解析时放弃该对象
+        """
+        raw = "".join(self._object_chars)
+        try:
+            obj = json.loads(raw)
+        except json.JSONDecodeError:
+            return self._abandon_object(text_parts)
+
+        self._object_chars = []
+        self._object_started = False
+        if is_tool_call_dict(obj):
+            tool_calls.append(obj)
+            self._skip_closing_fence = bool(self._fence)
+        else:
+            text_parts.append(self._fence + raw)
+        self._fence = ""
+        return None
@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..mcp.mcp_client import MCPClient
+
+
+class ToolExecutor:
+    """ 并发工具执行器
+
+    同一轮 LLM 响应中的多个工具调用并发执行：
+    - 全局并发上限: max_concurrency
+    - 单服务器并发上限: max_per_server，可在服务器配置中通过 "maxConcurrency" 覆盖
+    """
+    def __init__(
+        self,
+        execute_fn: Callable[[Dict[str, Any]], Awaitable[Any]],
+        resolve_client: Callable[[str], Optional[MCPClient]],
+        max_concurrency: int = 8,
+        max_per_server: int = 4,
+        server_semaphores: Optional[Dict[str, asyncio.Semaphore]] = None,
+    ):
+        """
+        Args:
+            execute_fn: 执行单个工具调用的协程函数，输入为 {"tool": ..., "arguments": ...}
+            resolve_client: 根据工具名称查找所属服务器
+            max_concurrency: 全局最大并发数
+            max_per_server: 单个服务器默认最大并发数
+            server_semaphores: 共享的服务器信号量，多个会话共用同一组服务器时传入，
+                使单服务器并发上限对所有会话生效
+        """
+        self._execute_fn = execute_fn
+        self._resolve_client = resolve_client
+        self.max_concurrency = max_concurrency
+        self.max_per_server = max_per_server
+        self._global_semaphore = asyncio.Semaphore(max_concurrency)
+        # {server_name: semaphore}
+        self._server_semaphores: Dict[str, asyncio.Semaphore] = (
+            server_semaphores if server_semaphores is not None else {}
+        )
+
+    def _get_server_semaphore(self, tool_name: str) -> Optional[asyncio.Semaphore]:
+        """ 获取工具所属服务器的信号量，未找到服务器时返回 None
+        """
+        client = self._resolve_client(tool_name)
+        if client is None:
+            return None
+        semaphore = self._server_semaphores.get(client.name)
+        if semaphore is None:
+            limit = client.config.get("maxConcurrency", self.max_per_server)
+            semaphore = asyncio.Semaphore(limit)
+            self._server_semaphores[client.name] = semaphore
+        return semaphore
+
+    async def _run(self, index: int, tool_call_data: Dict[str, Any]) -> Tuple[int, Any]:
+        """ 在并发限制内执行单个工具调用
+        """
+        server_semaphore = self._get_server_semaphore(tool_call_data["tool"])
+        # 先占用服务器名额，再占用全局名额，避免等待服务器时占住全局名额
+        if server_semaphore is None:
+            async with self._global_semaphore:
+                return index, await self._execute_fn(tool_call_data)
+        async with server_semaphore:
+            async with self._global_semaphore:
+                return index, await self._execute_fn(tool_call_data)
+
+    def submit(self, index: int, tool_call_data: Dict[str, Any]) -> "asyncio.Task[Tuple[int, Any]]":
+        """ 立即在后台开始执行单个工具调用，任务结果为 (index, 结果)
+        """
+        return asyncio.create_task(self._run(index, tool_call_data))
+
+    async def execute(self, tool_call_data_list: List[Dict[str, Any]]) -> List[Any]:
+        """ 并发执行所有工具调用，结果顺序与输入一致
+        """
+        results = await asyncio.gather(
+            *[self._run(i, data) for i, data in enumerate(tool_call_data_list)]
+        )
+        return [result for _, result in results]
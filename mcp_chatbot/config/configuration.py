@@ -16,7 +16,9 @@ class Configuration:
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
         model_name: Optional[str] = None,
-        model_type: Optional[str] = None
+        model_type: Optional[str] = None,
+        tool_call_mode: Optional[str] = None,
+        snapshot_path: Optional[str] = None
     ) -> None:
         """初始化配置，优先使用传入参数，其次从环境变量读取
         
@@ -25,12 +27,16 @@ class Configuration:
             base_url: API基础URL，默认为None
             model_name: 模型名称，默认为None
             model_type: 模型类型，默认为None
+            tool_call_mode: 工具调用方式（prompt/native），默认为None
+            snapshot_path: 服务器能力快照文件路径，空字符串表示不使用快照，默认为None
         """
         # 优先使用传入参数，若未传入则从环境变量读取
         self.api_key = api_key if api_key is not None else os.getenv("LLM_API_KEY")
         self.base_url = base_url if base_url is not None else os.getenv("LLM_API_URL")
         self.model_name = model_name if model_name is not None else os.getenv("LLM_MODEL_NAME")
         self.model_type = model_type if model_type is not None else os.getenv("LLM_MODEL_TYPE")
+        self.tool_call_mode = tool_call_mode if tool_call_mode is not None else os.getenv("LLM_TOOL_CALL_MODE", "prompt")
+        self.snapshot_path = snapshot_path if snapshot_path is not None else os.getenv("MCP_SNAPSHOT_PATH", ".cache/mcp_capabilities.json")
 
     @staticmethod
     def load_env() -> None:
@@ -68,4 +74,5 @@ class Configuration:
         print("[CFG]: LLM_MODEL_TYPE: ", self.model_type)
         print("[CFG]:    LLM_API_URL: ", self.base_url)
         print("[CFG]: LLM_MODEL_NAME: ", self.model_name)
+        print("[CFG]: LLM_TOOL_CALL_MODE: ", self.tool_call_mode)
         print()
\ No newline at end of file
@@ -1,25 +1,42 @@
-from openai import OpenAI
-from typing import Generator, Optional, Union
+import httpx
+from openai import AsyncOpenAI, NOT_GIVEN
+from typing import Any, AsyncGenerator, Optional, Tuple, Union
 import warnings
 
 class LLMService:
     """LLM服务类
+
+    基于 AsyncOpenAI 实现，所有请求均不阻塞事件循环；
+    同一进程内的多个 LLMService 实例共享底层 HTTP 连接池（keep-alive）。
     """
-    
+
+    # 进程内共享的 HTTP 客户端，按连接池参数区分
+    _shared_http_clients: dict[tuple, httpx.AsyncClient] = {}
+
     def __init__(
-        self, 
+        self,
         api_key: str,
         model_name: str = "deepseek-chat",
         base_url: str = "https://api.deepseek.com",
-        model_type: str = "deepseek"
+        model_type: str = "deepseek",
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0,
+        http_client: Optional[httpx.AsyncClient] = None
     ):
         """
         初始化LLM服务
-        
+
         :param api_key: API密钥（必须）
         :param model_name: 模型名称，默认deepseek-chat
         :param base_url: API基础URL，默认deepseek
         :param model_type: 服务类型，支持openai/deepseek
+        :param max_connections: 连接池最大连接数
+        :param max_keepalive_connections: 连接池最大保活连接数
+        :param keepalive_expiry: 空闲保活连接的过期时间（秒）
+        :param timeout: 单次请求超时时间（秒）
+        :param http_client: 自定义 httpx.AsyncClient，传入时不使用共享连接池
         """
         if not api_key:
             raise ValueError("API key is required")
@@ -29,26 +46,71 @@ class LLMService:
         self.api_key = api_key
         self.base_url = base_url
 
-        # 初始化同步客户端
-        self.client = OpenAI(
+        self.http_client = http_client or self.get_shared_http_client(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            timeout=timeout
+        )
+
+        # 初始化异步客户端
+        self.client = AsyncOpenAI(
             api_key=api_key,
-            base_url=None if model_type == "openai" else base_url
+            base_url=None if model_type == "openai" else base_url,
+            http_client=self.http_client
         )
 
-    def get_response(
-        self, 
+    @classmethod
+    def get_shared_http_client(
+        cls,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 60.0
+    ) -> httpx.AsyncClient:
+        """
+        获取共享的 HTTP 客户端，相同连接池参数的实例复用同一个客户端
+
+        :return: httpx.AsyncClient
+        """
+        key = (max_connections, max_keepalive_connections, keepalive_expiry, timeout)
+        client = cls._shared_http_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry
+                ),
+                timeout=httpx.Timeout(timeout, connect=10.0),
+                follow_redirects=True
+            )
+            cls._shared_http_clients[key] = client
+        return client
+
+    @classmethod
+    async def close_shared_http_clients(cls) -> None:
+        """关闭所有共享的 HTTP 客户端（进程退出前调用）"""
+        clients = list(cls._shared_http_clients.values())
+        cls._shared_http_clients.clear()
+        for client in clients:
+            if not client.is_closed:
+                await client.aclose()
+
+    async def get_response(
+        self,
         messages: list[dict[str, str]],
         stream: bool = False
-    ) -> Union[str, Generator[str, None, None]]:
+    ) -> Union[str, AsyncGenerator[str, None]]:
         """
-        获取同步LLM响应
-        
+        获取异步LLM响应
+
         :param messages: OpenAI格式消息历史
         :param stream: 是否启用流式模式
-        :return: 字符串或生成器
+        :return: 字符串或异步生成器
         """
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
                 temperature=0.7,
@@ -59,36 +121,149 @@ class LLMService:
             if stream:
                 return self._handle_stream_response(response)
             return response.choices[0].message.content
-            
+
         except Exception as e:
             error_msg = f"LLM请求失败: {str(e)}"
             if stream:
-                def error_generator():
+                async def error_generator():
                     yield error_msg
                 return error_generator()
             return error_msg
 
-    def _handle_stream_response(
-        self, 
-        response: Generator
-    ) -> Generator[str, None, None]:
+    async def get_tool_call_response(
+        self,
+        messages: list[dict[str, Any]],
+        tools: list[dict[str, Any]],
+        stream: bool = False
+    ) -> Union[dict[str, Any], AsyncGenerator[Tuple[str, Any], None]]:
+        """
+        获取原生工具调用（function calling）模式的LLM响应
+
+        :param messages: OpenAI格式消息历史
+        :param tools: OpenAI格式工具列表
+        :param stream: 是否启用流式模式
+        :return: 非流式时返回 assistant 消息字典（可能包含 tool_calls）；
+                 流式时返回异步生成器，产出 ("content", 文本片段) 与
+                 ("tool_call", 工具调用字典)，每个工具调用的参数完整后立即产出
+        """
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                tools=tools or NOT_GIVEN,
+                tool_choice="auto" if tools else NOT_GIVEN,
+                temperature=0.7,
+                max_tokens=4096,
+                stream=stream
+            )
+
+            if stream:
+                return self._handle_tool_stream_response(response)
+
+            message = response.choices[0].message
+            result: dict[str, Any] = {"role": "assistant", "content": message.content}
+            if message.tool_calls:
+                result["tool_calls"] = [
+                    {
+                        "id": tool_call.id,
+                        "type": "function",
+                        "function": {
+                            "name": tool_call.function.name,
+                            "arguments": tool_call.function.arguments or "{}"
+                        }
+                    }
+                    for tool_call in message.tool_calls
+                ]
+            return result
+
+        except Exception as e:
+            error_msg = f"LLM请求失败: {str(e)}"
+            if stream:
+                async def error_generator():
+                    yield ("content", error_msg)
+                return error_generator()
+            return {"role": "assistant", "content": error_msg}
+
+    async def _handle_tool_stream_response(
+        self,
+        response
+    ) -> AsyncGenerator[Tuple[str, Any], None]:
+        """处理原生工具调用模式的流式响应，按 index 拼接工具调用的增量参数"""
+        tool_calls_cache: dict[int, dict[str, Any]] = {}
+        current_index: Optional[int] = None
+
+        def build_tool_call(index: int) -> dict[str, Any]:
+            cached = tool_calls_cache[index]
+            return {
+                "id": cached["id"],
+                "type": "function",
+                "function": {
+                    "name": cached["name"],
+                    "arguments": cached["arguments"] or "{}"
+                }
+            }
+
+        try:
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if not delta:
+                    continue
+                if delta.content:
+                    yield ("content", delta.content)
+                for tool_call in delta.tool_calls or []:
+                    index = tool_call.index
+                    # 开始接收下一个工具调用，说明上一个已完整
+                    if current_index is not None and index != current_index:
+                        yield ("tool_call", build_tool_call(current_index))
+                    current_index = index
+                    cached = tool_calls_cache.setdefault(
+                        index, {"id": "", "name": "", "arguments": ""}
+                    )
+                    cached["id"] = tool_call.id or cached["id"]
+                    if tool_call.function:
+                        cached["name"] = tool_call.function.name or cached["name"]
+                        cached["arguments"] += tool_call.function.arguments or ""
+            if current_index is not None:
+                yield ("tool_call", build_tool_call(current_index))
+        except Exception as e:
+            yield ("content", f"LLM请求失败: {str(e)}")
+        finally:
+            await response.close()
+
+    async def _handle_stream_response(
+        self,
+        response
+    ) -> AsyncGenerator[str, None]:
         """处理流式响应"""
-        for chunk in response:
-            if not chunk.choices:
-                continue
-            delta = chunk.choices[0].delta
-            if delta and delta.content:
-                yield delta.content
+        try:
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta and delta.content:
+                    yield delta.content
+        except Exception as e:
+            yield f"LLM请求失败: {str(e)}"
+        finally:
+            await response.close()
 
 if __name__ == "__main__":
-    llm = LLMService(api_key="sk-xxxxxxxxxx")
-    messages=[
-        {"role": "system", "content": "You are a helpful assistant"},
-        {"role": "user", "content": "你好"},
-    ]
+    import asyncio
+
+    async def main():
+        llm = LLMService(api_key="sk-xxxxxxxxxx")
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant"},
+            {"role": "user", "content": "你好"},
+        ]
+
+        res = await llm.get_response(messages, stream=True)
 
-    res = llm.get_response(messages, stream=True)
+        # print(res)
+        async for content_chunk in res:
+            print(content_chunk, end="", flush=True)
+        await LLMService.close_shared_http_clients()
 
-    # print(res)
-    for content_chunk in res:
-        print(content_chunk, end="", flush=True)
+    asyncio.run(main())
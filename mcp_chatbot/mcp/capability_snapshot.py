@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any
+
+
+class CapabilitySnapshot:
+    """ 服务器能力快照（磁盘缓存）
+
+    记录每个服务器的 capabilities、工具、资源与 Prompt 列表，以及服务器启动配置
+    （type/command/args/env/url）的哈希值。下次启动时配置未变化即可直接使用快照构建
+    系统提示词，服务器进程在第一次真正需要时才启动。
+
+    文件格式:
+        {
+            "服务器名称": {
+                "hash": "...",
+                "savedAt": 1700000000.0,
+                "capabilities": {...},
+                "tools": [{"name": ..., "description": ..., "inputSchema": {...}}],
+                "resources": [...] | null,
+                "prompts": [...] | null
+            }
+        }
+    """
+    # 参与哈希的配置字段，其余字段（如 cache、retry）不影响服务器能力
+    HASH_FIELDS = ("type", "command", "args", "env", "url")
+
+    def __init__(self, path: str = ".cache/mcp_capabilities.json"):
+        """
+        参数:
+            path: 快照文件路径
+        """
+        self.path = path
+        self._entries: dict[str, dict[str, Any]] | None = None
+
+    @classmethod
+    def config_hash(cls, config: dict[str, Any]) -> str:
+        """ 服务器启动配置的内容哈希，args 中存在的文件同时计入大小与修改时间
+        """
+        payload: dict[str, Any] = {key: config.get(key) for key in cls.HASH_FIELDS}
+        files = {}
+        for arg in config.get("args") or []:
+            if isinstance(arg, str) and os.path.isfile(arg):
+                stat = os.stat(arg)
+                files[arg] = [stat.st_size, stat.st_mtime_ns]
+        payload["files"] = files
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load_entries(self) -> dict[str, dict[str, Any]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def load(self, name: str, config: dict[str, Any]) -> dict[str, Any] | None:
+        """ 读取服务器快照，不存在或配置已变化时返回 None
+        """
+        entry = self._load_entries().get(name)
+        if not entry or entry.get("hash") != self.config_hash(config):
+            return None
+        return entry
+
+    def save(self, name: str, config: dict[str, Any], **fields: Any) -> None:
+        """ 更新服务器快照，未传入的字段保留原值（配置变化时丢弃原值）
+
+        参数:
+            fields: capabilities / tools / resources / prompts，值为可 JSON 序列化的对象
+        """
+        entries = self._load_entries()
+        config_hash = self.config_hash(config)
+        entry = entries.get(name)
+        if not entry or entry.get("hash") != config_hash:
+            entry = {"hash": config_hash}
+        entry.update({key: value for key, value in fields.items() if value is not None})
+        entry["savedAt"] = time.time()
+        entries[name] = entry
+
+        # 先写临时文件再替换，避免并发读取到不完整的文件
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[ERR]: 保存能力快照失败: {e}")
@@ -3,14 +3,46 @@ import asyncio
 import json
 import os
 import shutil
-from contextlib import AsyncExitStack
-from typing import Any
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Callable
 
 
-from mcp import ClientSession, StdioServerParameters
+import anyio
+import httpx
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.shared.exceptions import McpError
+from mcp.client.sse import sse_client
 from mcp.client.stdio import stdio_client
 
+try:
+    from mcp.client.streamable_http import streamablehttp_client
+except ImportError:  # 旧版本 mcp 不支持 streamable-HTTP
+    streamablehttp_client = None
+
+# 连接已断开（子进程退出、管道关闭等）时抛出的异常
+_CONNECTION_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+)
+# 传输层错误（网络、HTTP 连接等），与超时一起计入熔断
+_TRANSPORT_ERRORS = (httpx.TransportError, OSError)
+
+
+def _is_timeout(error: Exception) -> bool:
+    """ 是否为调用超时（本地超时，或 SDK 读取响应超时返回的 408 错误）
+    """
+    if isinstance(error, TimeoutError):
+        return True
+    return isinstance(error, McpError) and error.error.code == httpx.codes.REQUEST_TIMEOUT
+
+from .capability_snapshot import CapabilitySnapshot
 from .mcp_tool import MCPTool
+from .resilience import CircuitBreaker, RetryBudget, ToolTimeoutError, backoff_delay
+from .server_pool import ServerPool
+from .tool_cache import ToolResultCache
 
 class MCPClient:
     """ MCP服务器管理类，处理连接和工具执行
@@ -29,6 +61,19 @@ class MCPClient:
                 "time_service.py"
                 ]
             },
+            "get_current_time_sse": {
+                "type": "sse",
+                "url": "http://localhost:8001/sse",
+                "headers": {"Authorization": "Bearer xxx"},
+                "timeout": 5,
+                "sseReadTimeout": 300
+            },
+            "get_weather": {
+                "command": "uv",
+                "args": ["run", "weather_service_zh.py"],
+                "lazy": true,
+                "idleTimeout": 300
+            },
             "defaultServer": "get_current_time",
             "system": "自定义系统提示词"
         }
@@ -36,17 +81,80 @@ class MCPClient:
     """
     def __init__(self,
         name: str,
-        config: dict[str, Any]
+        config: dict[str, Any],
+        tool_cache: ToolResultCache | None = None,
+        snapshot: CapabilitySnapshot | None = None
     ):
         self.name: str = name   # 服务器名称
         self.config: dict[str, Any] = config  # 服务器配置
+        # 工具结果缓存（可选），未传入时根据配置中的 "cache" 字段创建
+        self.tool_cache: ToolResultCache | None = (
+            tool_cache if tool_cache is not None
+            else ToolResultCache.from_config(config.get("cache"))
+        )
         self.stdio_context: Any | None = None  # 标准输入输出上下文
         self.session: ClientSession | None = None  # 客户端会话
         self._cleanup_lock: asyncio.Lock = asyncio.Lock()  # 异步清理锁
         self.exit_stack: AsyncExitStack = AsyncExitStack()  # 异步上下文管理器栈
+        self.capabilities: types.ServerCapabilities | None = None  # 服务器能力
+        # 能力目录缓存，None 表示需要重新获取；仅在 list_changed 通知或手动失效时刷新
+        self._tools: list[MCPTool] | None = None
+        self._resources: list[types.Resource] | None = None
+        self._prompts: list[types.Prompt] | None = None
+        # 能力快照（可选），用于未启动服务器时直接提供工具/资源/Prompt 列表
+        self.snapshot: CapabilitySnapshot | None = snapshot
+        # 按需启动（需在配置中开启）: 有可用快照时不预先启动服务器，第一次使用时才启动
+        self.lazy: bool = config.get("lazy", False)
+        # 空闲关闭: 超过 idle_timeout 秒没有工具调用时停止服务器进程，<= 0 表示不关闭
+        self.idle_timeout: float = config.get("idleTimeout", 0)
+        self.last_used: float = time.monotonic()
+        self._in_flight: int = 0  # 进行中的工具调用数
+        self._idle_task: asyncio.Task | None = None
+        self._idle_stopped: bool = False  # 是否因空闲而停止
+        # 目录变更监听器: callback(client, kind)，kind 为 tools/resources/prompts
+        self._change_listeners: list[Callable[["MCPClient", str], None]] = []
+        # 服务器进程池（可选），根据配置中的 "replicas" 字段创建，工具调用分摊到多个进程
+        self.pool: ServerPool | None = ServerPool.from_config(
+            name, config.get("replicas"), self._open_replica_session
+        )
+        # 健康检查: 定期 ping 会话，连接断开时重启服务器，interval <= 0 表示关闭
+        health_check = config.get("healthCheck", {})
+        self.health_check_interval: float = health_check.get("interval", 30.0)
+        self.health_check_timeout: float = health_check.get("timeout", 5.0)
+        self._supervisor_task: asyncio.Task | None = None
+        # 主连接在专属任务中建立和关闭，保证 exit_stack 在同一任务内进入与退出
+        self._connection_task: asyncio.Task | None = None
+        # 专属任务是否已完成握手并在等待关闭信号；未完成时关闭连接需直接取消该任务
+        self._connected: bool = False
+        self._stop_event: asyncio.Event = asyncio.Event()
+        self._closed: bool = False  # 是否已调用 cleanup
+        self._restart_lock: asyncio.Lock = asyncio.Lock()
+        # 连接代数，每次（重新）连接成功后加一，用于合并并发的重启请求
+        self.generation: int = 0
+        self.restarts: int = 0
+        # 工具调用超时（秒）: 数值，或 {"default": 60, "工具名称": 10}
+        tool_timeout = config.get("toolTimeout", 60.0)
+        self.tool_timeouts: dict[str, float] = (
+            dict(tool_timeout) if isinstance(tool_timeout, dict) else {"default": tool_timeout}
+        )
+        # 重试: 指数退避 + 抖动，重试预算限制重试放大
+        retry = config.get("retry", {})
+        # 超时后允许重试的工具（幂等工具），其他工具超时后不重试，避免重复执行
+        self.retry_safe_tools: set[str] = set(retry.get("retrySafe", []))
+        self.max_attempts: int = retry.get("maxAttempts", 2)
+        self.retry_base_delay: float = retry.get("baseDelay", 1.0)
+        self.retry_max_delay: float = retry.get("maxDelay", 10.0)
+        self.retry_budget: RetryBudget = RetryBudget(
+            ratio=retry.get("budgetRatio", 0.2),
+            capacity=retry.get("budgetCapacity", 10.0),
+        )
+        # 熔断器: 服务器连续失败时快速失败
+        self.circuit_breaker: CircuitBreaker = CircuitBreaker.from_config(
+            name, config.get("circuitBreaker")
+        )
 
-    async def initialize(self) -> None:
-        """ 初始化服务器
+    def _server_params(self) -> StdioServerParameters:
+        """ 构建服务器启动参数
         """
         # 解析执行命令（支持npx或自定义命令）
         command = (
@@ -61,91 +169,521 @@ class MCPClient:
         
 
         # 构建服务器参数
-        server_params = StdioServerParameters(
+        return StdioServerParameters(
             command=command,
             args=self.config["args"],  # 命令行参数
             env={**os.environ, **self.config["env"]} if self.config.get("env") else None  # 合并环境变量
         )
 
-        try:
-            # 建立标准输入输出连接
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
+    @property
+    def transport_type(self) -> str:
+        """ 传输方式: stdio / sse / streamable-http，由配置中的 "type" 字段决定
+        """
+        transport = self.config.get("type", "stdio").lower().replace("_", "-")
+        if transport in ("streamable-http", "streamablehttp", "http"):
+            return "streamable-http"
+        return transport
+
+    def _transport_context(self) -> Any:
+        """ 根据传输方式创建连接上下文
+        """
+        transport = self.transport_type
+        if transport == "stdio":
+            return stdio_client(self._server_params())
+
+        url = self.config.get("url")
+        if not url:
+            raise ValueError(f"[ERR]: 服务器 {self.name} 使用 {transport} 传输时必须配置 url")
+        headers = self.config.get("headers")
+        timeout = self.config.get("timeout", 5)
+        sse_read_timeout = self.config.get("sseReadTimeout", 300)
+
+        if transport == "sse":
+            return sse_client(
+                url,
+                headers=headers,
+                timeout=timeout,
+                sse_read_timeout=sse_read_timeout
             )
-            read, write = stdio_transport  # 获取读写通道
-            
-            # 创建客户端会话
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read, write)
+        if transport == "streamable-http":
+            if streamablehttp_client is None:
+                raise RuntimeError(
+                    f"[ERR]: 当前 mcp 版本不支持 streamable-HTTP 传输（服务器 {self.name}），"
+                    "请升级 mcp 或改用 sse"
+                )
+            return streamablehttp_client(
+                url,
+                headers=headers,
+                timeout=timeout,
+                sse_read_timeout=sse_read_timeout
             )
-            await session.initialize()
+        raise ValueError(f"[ERR]: 服务器 {self.name} 不支持的传输方式: {transport}")
+
+    async def _open_session(
+        self,
+        exit_stack: AsyncExitStack,
+        message_handler: Any | None = None
+    ) -> tuple[ClientSession, types.InitializeResult]:
+        """ 在 exit_stack 中建立服务器连接并完成初始化握手
+        """
+        # 建立连接（标准输入输出 / SSE / streamable-HTTP）
+        transport = await exit_stack.enter_async_context(self._transport_context())
+        read, write = transport[0], transport[1]  # 获取读写通道
+
+        # 创建客户端会话
+        session = await exit_stack.enter_async_context(
+            ClientSession(read, write, message_handler=message_handler)
+        )
+        init_result = await session.initialize()
+        return session, init_result
+
+    async def _open_replica_session(self, exit_stack: AsyncExitStack) -> ClientSession:
+        """ 建立进程池副本的连接，副本只用于工具调用，不处理目录通知
+        """
+        session, _ = await self._open_session(exit_stack)
+        return session
+
+    async def _run_connection(self, ready: asyncio.Future) -> None:
+        """ 主连接的专属任务：建立连接后等待关闭信号
+        """
+        session = None
+        try:
+            async with self.exit_stack:
+                session, init_result = await self._open_session(
+                    self.exit_stack, self._message_handler
+                )
+                self._connected = True
+                if not ready.done():
+                    ready.set_result((session, init_result))
+                await self._stop_event.wait()
+        except BaseException as e:
+            if not ready.done():
+                if isinstance(e, asyncio.CancelledError):
+                    ready.cancel()
+                else:
+                    ready.set_exception(e)
+            elif isinstance(e, asyncio.CancelledError):
+                pass
+            elif self._stop_event.is_set():
+                print(f"[LOG]: 清理服务器 {self.name} 时出错: {e}")
+            else:
+                print(f"[ERR]: 服务器 {self.name} 连接异常退出: {e}")
+        finally:
+            if session is not None and self.session is session:
+                self.session = None
+
+    async def initialize(self) -> None:
+        """ 初始化服务器
+        """
+        self._closed = False
+        self._stop_event = asyncio.Event()
+        self._connected = False
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._connection_task = asyncio.create_task(self._run_connection(ready))
+        try:
+            session, init_result = await ready
+            self.capabilities = init_result.capabilities
             self.session = session
-        except Exception as e:
-            print(f"[ERR]: 初始化服务器 {self.name} 失败: {e}")
-            await self.cleanup()
+            self.generation += 1
+            self.invalidate()
+            if self.pool is not None:
+                await self.pool.start(session)
+        except BaseException as e:
+            # 包括启动超时导致的取消：握手未完成的连接任务同样需要清理
+            if not isinstance(e, asyncio.CancelledError):
+                print(f"[ERR]: 初始化服务器 {self.name} 失败: {e}")
+            await self._close_connection()
             raise
+        self.last_used = time.monotonic()
+        self._idle_stopped = False
+        if self.health_check_interval > 0 and self._supervisor_task is None:
+            self._supervisor_task = asyncio.create_task(self._supervise())
+        if self.idle_timeout > 0 and self._idle_task is None:
+            self._idle_task = asyncio.create_task(self._stop_when_idle())
 
-    async def list_tools(self) -> list[Any]:
-        """获取服务器可用工具列表
+    async def _ensure_started(self) -> None:
+        """ 服务器未运行时启动（首次使用或连接意外断开后），已调用 cleanup 时抛出异常
         """
-        if not self.session:
+        if self.session is not None:
+            return
+        if self._closed:
             raise RuntimeError(f"[ERR]: 服务器 {self.name} 未初始化")
+        async with self._restart_lock:
+            if self.session is not None:
+                return
+            print(f"[SYS]: 按需启动服务器 {self.name}...")
+            start_time = time.perf_counter()
+            async with asyncio.timeout(self.config.get("startupTimeout")):
+                await self.initialize()
+            print(f"[SYS]: 服务器 {self.name} 启动成功（耗时 {time.perf_counter() - start_time:.2f}s）")
+
+    def load_snapshot(self) -> bool:
+        """ 从能力快照加载工具/资源/Prompt 列表，不启动服务器
 
-        tools_response = await self.session.list_tools()
-        return [
-            MCPTool(tool.name, tool.description, tool.inputSchema)
-            for item in tools_response
-            if isinstance(item, tuple) and item[0] == "tools"
-            for tool in item[1]  # 解析工具数据
+        返回:
+            快照存在且服务器配置未变化时返回 True
+        """
+        if self.snapshot is None:
+            return False
+        entry = self.snapshot.load(self.name, self.config)
+        if entry is None or entry.get("tools") is None:
+            return False
+        if entry.get("capabilities") is not None:
+            self.capabilities = types.ServerCapabilities.model_validate(entry["capabilities"])
+        self._tools = [
+            MCPTool(tool["name"], tool.get("description"), tool.get("inputSchema") or {})
+            for tool in entry["tools"]
         ]
+        if entry.get("resources") is not None:
+            self._resources = [types.Resource.model_validate(item) for item in entry["resources"]]
+        if entry.get("prompts") is not None:
+            self._prompts = [types.Prompt.model_validate(item) for item in entry["prompts"]]
+        return True
+
+    def _save_snapshot(self, **fields: Any) -> None:
+        """ 将最新获取的目录写入能力快照
+        """
+        if self.snapshot is None:
+            return
+        capabilities = (
+            self.capabilities.model_dump(mode="json", exclude_none=True)
+            if self.capabilities is not None else None
+        )
+        self.snapshot.save(self.name, self.config, capabilities=capabilities, **fields)
+
+    async def ping(self) -> bool:
+        """ 检查会话是否可用（在 health_check_timeout 内响应 ping）
+        """
+        if self.session is None:
+            return False
+        try:
+            async with asyncio.timeout(self.health_check_timeout):
+                await self.session.send_ping()
+            return True
+        except Exception:
+            return False
+
+    async def restart(self, generation: int | None = None) -> None:
+        """ 关闭当前连接并重新启动服务器
+
+        参数:
+            generation: 发现连接异常时的连接代数；连接已被其他调用重建时不再重启
+        """
+        async with self._restart_lock:
+            if generation is not None and generation != self.generation and self.session is not None:
+                return
+            print(f"[SYS]: 服务器 {self.name} 连接异常，正在重启...")
+            start_time = time.perf_counter()
+            await self._close_connection()
+            await self.initialize()
+            self.restarts += 1
+            print(f"[SYS]: 服务器 {self.name} 重启成功（耗时 {time.perf_counter() - start_time:.2f}s）")
+
+    async def _supervise(self) -> None:
+        """ 定期检查主连接与进程池副本，连接断开时自动重启
+        """
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            # 空闲关闭的服务器等待下次使用时再启动
+            if self._idle_stopped:
+                continue
+            generation = self.generation
+            if not await self.ping():
+                try:
+                    await self.restart(generation)
+                except Exception as e:
+                    print(f"[ERR]: 服务器 {self.name} 重启失败，将在下次检查时重试: {e}")
+                    continue
+            if self.pool is not None:
+                await self.pool.check_health(self.health_check_timeout)
+
+    async def _stop_when_idle(self) -> None:
+        """ 定期检查服务器是否空闲，空闲超时后停止服务器进程（目录缓存保留），下次使用时按需启动
+        """
+        interval = max(1.0, self.idle_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            if self.session is None or self._in_flight > 0:
+                continue
+            if time.monotonic() - self.last_used <= self.idle_timeout:
+                continue
+            async with self._restart_lock:
+                if self.session is None or self._in_flight > 0:
+                    continue
+                # 先置空会话，停止期间到达的调用会在 _ensure_started 中等待并重新启动
+                self.session = None
+                self._idle_stopped = True
+                await self._close_connection()
+            print(f"[SYS]: 服务器 {self.name} 空闲超过 {self.idle_timeout}s，已停止")
+
+    async def _message_handler(self, message: Any) -> None:
+        """ 处理服务器推送的消息，收到 list_changed 通知时使对应目录缓存失效
+        """
+        if not isinstance(message, types.ServerNotification):
+            return
+        notification = message.root
+        if isinstance(notification, types.ToolListChangedNotification):
+            self.invalidate("tools")
+        elif isinstance(notification, types.ResourceListChangedNotification):
+            self.invalidate("resources")
+        elif isinstance(notification, types.PromptListChangedNotification):
+            self.invalidate("prompts")
+
+    def add_change_listener(self, listener: Callable[["MCPClient", str], None]) -> None:
+        """ 注册目录变更监听器，目录缓存失效时回调 listener(client, kind)
+        """
+        self._change_listeners.append(listener)
+
+    def remove_change_listener(self, listener: Callable[["MCPClient", str], None]) -> None:
+        """ 移除目录变更监听器
+        """
+        if listener in self._change_listeners:
+            self._change_listeners.remove(listener)
+
+    def invalidate(self, kind: str | None = None) -> None:
+        """ 使目录缓存失效，下次访问时重新获取
+
+        参数:
+            kind: tools/resources/prompts，None 表示全部
+        """
+        kinds = ("tools", "resources", "prompts") if kind is None else (kind,)
+        for item in kinds:
+            setattr(self, f"_{item}", None)
+            for listener in self._change_listeners:
+                try:
+                    listener(self, item)
+                except Exception as e:
+                    print(f"[ERR]: 目录变更回调执行失败: {e}")
+
+    async def list_tools(self, refresh: bool = False) -> list[MCPTool]:
+        """获取服务器可用工具列表（优先使用缓存）
+
+        参数:
+            refresh: 是否忽略缓存强制重新获取
+        """
+        if self._tools is None or refresh:
+            await self._ensure_started()
+            tools_response = await self.session.list_tools()
+            self._tools = [
+                MCPTool(tool.name, tool.description, tool.inputSchema)
+                for item in tools_response
+                if isinstance(item, tuple) and item[0] == "tools"
+                for tool in item[1]  # 解析工具数据
+            ]
+            self._save_snapshot(tools=[
+                {"name": tool.name, "description": tool.description, "inputSchema": tool.input_schema}
+                for tool in self._tools
+            ])
+        return self._tools
+
+    async def list_resources(self, refresh: bool = False) -> list[types.Resource]:
+        """获取服务器资源列表（优先使用缓存），服务器不支持资源时返回空列表
+        """
+        if self.capabilities is not None and self.capabilities.resources is None:
+            return []
+        if self._resources is None or refresh:
+            await self._ensure_started()
+            resources_response = await self.session.list_resources()
+            self._resources = list(resources_response.resources)
+            self._save_snapshot(resources=[
+                item.model_dump(mode="json", exclude_none=True) for item in self._resources
+            ])
+        return self._resources
+
+    async def list_prompts(self, refresh: bool = False) -> list[types.Prompt]:
+        """获取服务器 Prompt 列表（优先使用缓存），服务器不支持 Prompt 时返回空列表
+        """
+        if self.capabilities is not None and self.capabilities.prompts is None:
+            return []
+        if self._prompts is None or refresh:
+            await self._ensure_started()
+            prompts_response = await self.session.list_prompts()
+            self._prompts = list(prompts_response.prompts)
+            self._save_snapshot(prompts=[
+                item.model_dump(mode="json", exclude_none=True) for item in self._prompts
+            ])
+        return self._prompts
     
     async def execute_tool(
         self,
         tool_name: str,
         arguments: dict[str, Any],
-        retries: int = 2,
-        delay: float = 1.0,
+        retries: int | None = None,
+        delay: float | None = None,
     ) -> str:
         """
-        执行工具（带重试机制）
+        执行工具（带超时、重试与熔断，开启缓存时优先返回缓存结果）
         
         参数:
             tool_name: 工具名称
             arguments: 参数字典
-            retries: 重试次数
-            delay: 重试间隔（秒）
+            retries: 最大尝试次数，默认使用配置 retry.maxAttempts
+            delay: 退避基础间隔（秒），默认使用配置 retry.baseDelay
         """
-        if not self.session:
-            raise RuntimeError(f"[ERR]: 服务器 {self.name} 未初始化")
-        
+        retries = self.max_attempts if retries is None else retries
+        delay = self.retry_base_delay if delay is None else delay
+        self._in_flight += 1
+        async def call() -> Any:
+            # 按需启动、空闲关闭后或连接已意外断开时，先启动服务器（缓存命中时不启动）
+            await self._ensure_started()
+            return await self._call_tool(tool_name, arguments, retries, delay)
+
+        try:
+            if self.tool_cache is not None:
+                return await self.tool_cache.get_or_call(self.name, tool_name, arguments, call)
+            return await call()
+        finally:
+            self._in_flight -= 1
+            self.last_used = time.monotonic()
+
+    @asynccontextmanager
+    async def _acquire_session(self) -> AsyncIterator[ClientSession]:
+        """ 获取用于工具调用的会话，配置了进程池时选择最空闲的副本
+        """
+        if self.pool is None:
+            yield self.session
+            return
+        async with self.pool.acquire() as session:
+            yield session
+
+    async def _recover(self, session: ClientSession | None, generation: int) -> None:
+        """ 调用过程中连接断开：主连接重启服务器，进程池副本直接移除
+        """
+        if self.pool is not None and session is not None and session is not self.session:
+            await self.pool.discard(session)
+            return
+        await self.restart(generation)
+
+    def tool_timeout(self, tool_name: str) -> float | None:
+        """ 工具调用超时时间（秒），None 或 <= 0 表示不限制
+        """
+        timeout = self.tool_timeouts.get(tool_name, self.tool_timeouts.get("default"))
+        return timeout if timeout and timeout > 0 else None
+
+    async def _call_with_timeout(
+        self,
+        session: ClientSession,
+        tool_name: str,
+        arguments: dict[str, Any],
+    ) -> Any:
+        """ 单次工具调用，超时后放弃等待该请求
+
+        mcp SDK 没有提供获取请求 ID 的公开接口，因此不向服务器发送 notifications/cancelled，
+        服务器仍会执行完该请求，响应到达后被忽略。
+        """
+        timeout = self.tool_timeout(tool_name)
+        try:
+            async with asyncio.timeout(timeout):
+                return await session.call_tool(tool_name, arguments)
+        except TimeoutError:
+            raise ToolTimeoutError(
+                f"[ERR]: 工具 {tool_name} 调用超时（{timeout}s）"
+            ) from None
+
+    async def _call_tool(
+        self,
+        tool_name: str,
+        arguments: dict[str, Any],
+        retries: int,
+        delay: float,
+    ) -> Any:
+        """ 调用服务器工具
+
+        - 失败后重试，重试间隔为带抖动的指数退避；超时的调用只有工具在 retry.retrySafe 中时才重试，
+          服务器返回的错误（参数错误、未知工具等）不重试
+        - 重试受 retry_budget 限制，熔断器打开时快速失败；只有超时与传输层错误计入熔断
+        - 连接断开时重建连接并重放一次调用（不计入重试次数）
+        """
+        self.circuit_breaker.before_call()
+        self.retry_budget.deposit()
         attempt = 0
-        while attempt < retries:
+        replayed = False
+        while True:
+            generation = self.generation
+            used_session = None
             try:
                 print(f"[LOG]: 调用工具 [{tool_name}] 参数: {arguments}")
-                tool_result = await self.session.call_tool(tool_name, arguments)
+                async with self._acquire_session() as session:
+                    used_session = session
+                    tool_result = await self._call_with_timeout(session, tool_name, arguments)
                 print(f"[LOG]: 调用结果: {tool_result.model_dump()}")
                 print(f"[LOG]: 工具响应: {tool_result.content}\n")
-                
+
+                self.circuit_breaker.record_success()
                 return tool_result
+            except _CONNECTION_ERRORS as e:
+                if replayed:
+                    self.circuit_breaker.record_failure()
+                    raise
+                replayed = True
+                print(f"[ERR]: 服务器 {self.name} 连接断开: {e!r}，重建连接后重放调用")
+                try:
+                    await self._recover(used_session, generation)
+                except Exception:
+                    self.circuit_breaker.record_failure()
+                    raise
+            except asyncio.CancelledError:
+                self.circuit_breaker.release()
+                raise
             except Exception as e:
                 attempt += 1
-                print(f"[ERR]: 工具执行失败: {e}. 第 {attempt} 次重试（最多 {retries} 次）")
-                if attempt < retries:
-                    await asyncio.sleep(delay)
+                timed_out = _is_timeout(e)
+                if timed_out or isinstance(e, _TRANSPORT_ERRORS):
+                    self.circuit_breaker.record_failure()
                 else:
+                    # 服务器正常返回的错误或客户端错误，不代表服务器故障
+                    self.circuit_breaker.release()
+                print(f"[ERR]: 工具执行失败: {e}. 第 {attempt} 次尝试（最多 {retries} 次）")
+                if attempt >= retries:
                     print("[ERR]: 达到最大重试次数，操作终止")
                     raise
+                if timed_out and tool_name not in self.retry_safe_tools:
+                    print(f"[ERR]: 工具 {tool_name} 调用超时且未标记为可重试（retry.retrySafe），不重试")
+                    raise
+                if isinstance(e, McpError) and not timed_out:
+                    print("[ERR]: 服务器返回错误，不重试")
+                    raise
+                if self.circuit_breaker.is_open:
+                    print(f"[ERR]: 服务器 {self.name} 已熔断，停止重试")
+                    raise
+                if not self.retry_budget.withdraw():
+                    print(f"[ERR]: 服务器 {self.name} 重试预算已用尽，停止重试")
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, delay, self.retry_max_delay))
 
-    async def cleanup(self) -> None:
-        """ 清理服务器 
+    async def _close_connection(self) -> None:
+        """ 关闭进程池与主连接，之后可重新 initialize
         """
         async with self._cleanup_lock:  # 使用锁防止并发清理
             try:
-                await self.exit_stack.aclose()  # 关闭所有异步上下文
-                self.session = None
-                self.stdio_context = None
+                if self.pool is not None:
+                    await self.pool.close()
+                # 通知专属任务退出 exit_stack，关闭所有异步上下文
+                self._stop_event.set()
+                if self._connection_task is not None:
+                    # 握手未完成时任务不会等待关闭信号（如服务器不响应 initialize），直接取消
+                    if not self._connected:
+                        self._connection_task.cancel()
+                    await asyncio.gather(self._connection_task, return_exceptions=True)
             except Exception as e:
                 print(f"[LOG]: 清理服务器 {self.name} 时出错: {e}")
+            finally:
+                self._connection_task = None
+                self._connected = False
+                self.session = None
+                self.stdio_context = None
+                self.exit_stack = AsyncExitStack()
+
+    async def cleanup(self) -> None:
+        """ 清理服务器 
+        """
+        self._closed = True
+        for task in (self._supervisor_task, self._idle_task):
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+        self._supervisor_task = None
+        self._idle_task = None
+        await self._close_connection()
 
     async def __aenter__(self):
         """Enter the async context manager.
@@ -33,3 +33,15 @@ class MCPTool:
         Arguments:
         {chr(10).join(args_desc)}
         """.replace("        ", "")
+
+    def to_openai_tool(self) -> dict[str, Any]:
+        """ 转换为 OpenAI function calling 的工具格式
+        """
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description or "",
+                "parameters": self.input_schema or {"type": "object", "properties": {}}
+            }
+        }
@@ -0,0 +1,142 @@
+import random
+import time
+from typing import Any
+
+
+class ToolTimeoutError(TimeoutError):
+    """ 工具调用超时
+    """
+
+
+class CircuitOpenError(RuntimeError):
+    """ 服务器熔断中，请求被快速拒绝
+    """
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """ 指数退避（full jitter）：在 [0, min(max_delay, base_delay * 2^(attempt-1))] 内随机取值
+
+    参数:
+        attempt: 已失败的次数（从 1 开始）
+        base_delay: 基础间隔（秒）
+        max_delay: 最大间隔（秒）
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+class RetryBudget:
+    """ 重试预算（令牌桶）
+
+    每次首次调用存入 ratio 个令牌，每次重试消耗 1 个令牌，令牌不足时不再重试。
+    长期来看重试次数不超过调用次数的 ratio 倍，服务器故障时避免重试放大流量；
+    capacity 为允许的突发重试次数。
+    """
+    def __init__(self, ratio: float = 0.2, capacity: float = 10.0):
+        """
+        参数:
+            ratio: 重试次数与调用次数的比例上限
+            capacity: 令牌上限（初始令牌数）
+        """
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens: float = capacity
+
+    def deposit(self) -> None:
+        """ 记录一次首次调用
+        """
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """ 申请一次重试，预算不足时返回 False
+        """
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class CircuitBreaker:
+    """ 服务器熔断器
+
+    - closed: 正常放行，连续失败 failure_threshold 次后进入 open
+    - open: 快速失败，reset_timeout 秒后进入 half-open
+    - half-open: 只放行一个试探请求，成功则恢复 closed，失败则重新 open
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        参数:
+            name: 服务器名称
+            failure_threshold: 触发熔断的连续失败次数，<= 0 表示不熔断
+            reset_timeout: 熔断持续时间（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state: str = "closed"
+        self._failures: int = 0
+        self._opened_at: float = 0.0
+        self._probing: bool = False
+
+    @classmethod
+    def from_config(cls, name: str, config: dict[str, Any] | None) -> "CircuitBreaker":
+        """ 根据服务器配置中的 "circuitBreaker" 字段创建熔断器
+        """
+        config = config or {}
+        return cls(
+            name,
+            failure_threshold=config.get("failureThreshold", 5),
+            reset_timeout=config.get("resetTimeout", 30.0),
+        )
+
+    def before_call(self) -> None:
+        """ 调用前检查，熔断中时抛出 CircuitOpenError
+        """
+        if self.state == "closed":
+            return
+        if self.state == "open":
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"[ERR]: 服务器 {self.name} 熔断中，{remaining:.1f}s 后重试"
+                )
+            self.state = "half-open"
+            self._probing = False
+        # half-open: 只放行一个试探请求
+        if self._probing:
+            raise CircuitOpenError(f"[ERR]: 服务器 {self.name} 熔断恢复试探中")
+        self._probing = True
+
+    def record_success(self) -> None:
+        """ 记录一次成功调用
+        """
+        self._failures = 0
+        self._probing = False
+        if self.state != "closed":
+            print(f"[SYS]: 服务器 {self.name} 熔断恢复")
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        """ 记录一次失败调用
+        """
+        self._failures += 1
+        self._probing = False
+        if self.state == "half-open" or (
+            self.failure_threshold > 0 and self._failures >= self.failure_threshold
+        ):
+            if self.state != "open":
+                print(f"[ERR]: 服务器 {self.name} 连续失败 {self._failures} 次，熔断 {self.reset_timeout}s")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """ 调用被取消（未得出结果）时释放试探名额
+        """
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "open"
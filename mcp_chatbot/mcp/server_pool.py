@@ -0,0 +1,270 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from mcp import ClientSession
+
+# 在给定的 exit_stack 中建立一个新的服务器连接并返回已初始化的会话
+SessionOpener = Callable[[AsyncExitStack], Awaitable[ClientSession]]
+
+
+class ServerReplica:
+    """ 服务器副本：一个独立的服务器进程及其会话
+
+    副本的连接在专属任务中建立和关闭，保证上下文在同一任务内进入与退出。
+    """
+    def __init__(self, index: int, opener: SessionOpener | None = None):
+        """
+        参数:
+            index: 副本编号，0 为主连接
+            opener: 建立连接的函数；为 None 时表示副本由外部管理（主连接）
+        """
+        self.index = index
+        self.opener = opener
+        self.session: ClientSession | None = None
+        self.outstanding: int = 0  # 进行中的请求数
+        self.last_used: float = time.monotonic()
+        self._task: asyncio.Task | None = None
+        self._stop_event: asyncio.Event = asyncio.Event()
+
+    @property
+    def is_primary(self) -> bool:
+        return self.opener is None
+
+    async def start(self) -> None:
+        """ 在专属任务中建立连接，连接建立后返回
+        """
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        async def run() -> None:
+            try:
+                async with AsyncExitStack() as exit_stack:
+                    self.session = await self.opener(exit_stack)
+                    ready.set_result(None)
+                    await self._stop_event.wait()
+            except BaseException as e:
+                if not ready.done():
+                    ready.set_exception(e)
+                elif not isinstance(e, asyncio.CancelledError):
+                    print(f"[ERR]: 服务器副本 {self.index} 异常退出: {e}")
+            finally:
+                self.session = None
+
+        self._task = asyncio.create_task(run())
+        await ready
+
+    async def close(self) -> None:
+        """ 关闭连接（主连接由外部关闭）
+        """
+        if self._task is None:
+            return
+        self._stop_event.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+class ServerPool:
+    """ 服务器进程池
+
+    同一个服务器启动多个进程副本，分摊工具调用：
+    - 按最少进行中请求数（least outstanding requests）选择副本
+    - 所有副本的进行中请求数都达到 scale_up_threshold 时，后台扩容一个副本（不超过 max_replicas）
+    - 空闲超过 idle_timeout 秒的副本被关闭（不少于 min_replicas）
+    主连接（副本 0）负责工具/资源目录与通知，始终保留。
+
+    服务器配置示例（server_config.json）:
+        "replicas": {
+            "min": 1,
+            "max": 4,
+            "idleTimeout": 60,
+            "scaleUpThreshold": 1
+        }
+    """
+    def __init__(
+        self,
+        name: str,
+        opener: SessionOpener,
+        min_replicas: int = 1,
+        max_replicas: int = 1,
+        idle_timeout: float = 60.0,
+        scale_up_threshold: int = 1,
+    ):
+        """
+        参数:
+            name: 服务器名称
+            opener: 建立副本连接的函数
+            min_replicas: 最少副本数（含主连接）
+            max_replicas: 最多副本数（含主连接）
+            idle_timeout: 副本空闲多久后关闭（秒）
+            scale_up_threshold: 触发扩容的单副本进行中请求数
+        """
+        self.name = name
+        self.opener = opener
+        self.min_replicas = max(1, min_replicas)
+        self.max_replicas = max(self.min_replicas, max_replicas)
+        self.idle_timeout = idle_timeout
+        self.scale_up_threshold = max(1, scale_up_threshold)
+        self.replicas: list[ServerReplica] = []
+        self._next_index: int = 1
+        self._scaling: bool = False
+        self._tasks: set[asyncio.Task] = set()
+        self._reaper_task: asyncio.Task | None = None
+
+    @classmethod
+    def from_config(
+        cls,
+        name: str,
+        config: dict[str, Any] | None,
+        opener: SessionOpener
+    ) -> "ServerPool | None":
+        """ 根据服务器配置中的 "replicas" 字段创建进程池，未配置或最多只有一个副本时返回 None
+        """
+        if not config or config.get("max", 1) <= 1:
+            return None
+        return cls(
+            name,
+            opener,
+            min_replicas=config.get("min", 1),
+            max_replicas=config["max"],
+            idle_timeout=config.get("idleTimeout", 60.0),
+            scale_up_threshold=config.get("scaleUpThreshold", 1),
+        )
+
+    async def start(self, primary_session: ClientSession) -> None:
+        """ 以主连接初始化进程池，并并发启动至最少副本数
+        """
+        primary = ServerReplica(0)
+        primary.session = primary_session
+        self.replicas = [primary]
+        await asyncio.gather(
+            *[self._add_replica() for _ in range(self.min_replicas - 1)],
+            return_exceptions=True
+        )
+        if self.idle_timeout > 0 and self._reaper_task is None:
+            self._reaper_task = asyncio.create_task(self._reap_idle_replicas())
+
+    async def close(self) -> None:
+        """ 关闭所有副本（主连接除外）
+        """
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            self._reaper_task = None
+        for task in self._tasks:
+            task.cancel()
+        replicas, self.replicas = self.replicas, []
+        await asyncio.gather(
+            *[replica.close() for replica in replicas],
+            return_exceptions=True
+        )
+
+    async def _add_replica(self) -> None:
+        """ 启动一个新副本并加入进程池
+        """
+        replica = ServerReplica(self._next_index, self.opener)
+        self._next_index += 1
+        try:
+            await replica.start()
+        except Exception as e:
+            print(f"[ERR]: 服务器 {self.name} 副本 {replica.index} 启动失败: {e}")
+            return
+        replica.last_used = time.monotonic()
+        self.replicas.append(replica)
+        print(f"[SYS]: 服务器 {self.name} 扩容至 {len(self.replicas)} 个副本")
+
+    def _maybe_scale_up(self) -> None:
+        """ 所有副本都繁忙时后台扩容，同一时刻只扩容一个副本
+        """
+        if self._scaling or len(self.replicas) >= self.max_replicas:
+            return
+        if any(replica.outstanding < self.scale_up_threshold for replica in self.replicas):
+            return
+        self._scaling = True
+
+        async def scale_up() -> None:
+            try:
+                await self._add_replica()
+            finally:
+                self._scaling = False
+
+        task = asyncio.create_task(scale_up())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[ClientSession]:
+        """ 选择进行中请求数最少的副本，在请求期间占用
+        """
+        self._maybe_scale_up()
+        candidates = [replica for replica in self.replicas if replica.session is not None]
+        if not candidates:
+            raise RuntimeError(f"[ERR]: 服务器 {self.name} 没有可用副本")
+        replica = min(candidates, key=lambda item: item.outstanding)
+        replica.outstanding += 1
+        try:
+            yield replica.session
+        finally:
+            replica.outstanding -= 1
+            replica.last_used = time.monotonic()
+
+    async def _reap_idle_replicas(self) -> None:
+        """ 定期关闭空闲超时的副本
+        """
+        interval = max(1.0, self.idle_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for replica in list(self.replicas):
+                if len(self.replicas) <= self.min_replicas:
+                    break
+                if (
+                    not replica.is_primary
+                    and replica.outstanding == 0
+                    and now - replica.last_used > self.idle_timeout
+                ):
+                    self.replicas.remove(replica)
+                    await replica.close()
+                    print(f"[SYS]: 服务器 {self.name} 缩容至 {len(self.replicas)} 个副本")
+
+    async def discard(self, session: ClientSession) -> None:
+        """ 移除连接已断开的副本，后续请求繁忙时会重新扩容
+        """
+        for replica in list(self.replicas):
+            if replica.session is session and not replica.is_primary:
+                self.replicas.remove(replica)
+                await replica.close()
+                print(f"[SYS]: 服务器 {self.name} 副本 {replica.index} 连接断开，已移除")
+
+    async def check_health(self, timeout: float) -> None:
+        """ ping 所有副本（主连接除外），移除无响应的副本并补足最少副本数
+        """
+        async def ping(replica: ServerReplica) -> bool:
+            if replica.session is None:
+                return False
+            try:
+                async with asyncio.timeout(timeout):
+                    await replica.session.send_ping()
+                return True
+            except Exception:
+                return False
+
+        replicas = [replica for replica in self.replicas if not replica.is_primary]
+        results = await asyncio.gather(*[ping(replica) for replica in replicas])
+        for replica, healthy in zip(replicas, results):
+            if not healthy and replica in self.replicas:
+                self.replicas.remove(replica)
+                await replica.close()
+                print(f"[SYS]: 服务器 {self.name} 副本 {replica.index} 无响应，已移除")
+        await asyncio.gather(
+            *[self._add_replica() for _ in range(self.min_replicas - len(self.replicas))],
+            return_exceptions=True
+        )
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """ 各副本的进行中请求数
+        """
+        return {
+            "replicas": len(self.replicas),
+            "outstanding": [replica.outstanding for replica in self.replicas],
+        }
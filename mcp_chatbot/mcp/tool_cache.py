@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+
+class ToolResultCache:
+    """ 工具调用结果缓存（TTL + LRU）
+
+    - 缓存键: (服务器名称, 工具名称, 规范化后的参数)
+    - 仅缓存配置了 TTL 的工具（按需开启）
+    - 超过 max_size 时淘汰最久未使用的结果
+    - 相同请求并发到达时合并为一次调用
+
+    服务器配置示例（server_config.json）:
+        "cache": {
+            "maxSize": 256,
+            "ttl": {"get_weather": 600}
+        }
+    """
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl: dict[str, float] | None = None,
+    ):
+        """
+        参数:
+            max_size: 最大缓存条目数
+            ttl: {工具名称: 缓存有效期(秒)}，未配置的工具不缓存
+        """
+        self.max_size = max_size
+        self.ttl: dict[str, float] = ttl or {}
+        # {key: (过期时间, 结果)}
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        # {key: 进行中的请求}
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any] | None) -> "ToolResultCache | None":
+        """ 根据服务器配置中的 "cache" 字段创建缓存，未配置时返回 None
+        """
+        if not config:
+            return None
+        return cls(
+            max_size=config.get("maxSize", 256),
+            ttl=config.get("ttl", {}),
+        )
+
+    @staticmethod
+    def make_key(server_name: str, tool_name: str, arguments: dict[str, Any]) -> tuple:
+        """ 生成缓存键，参数按键排序后序列化，保证等价参数得到相同的键
+        """
+        canonical_args = json.dumps(
+            arguments or {},
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+        return (server_name, tool_name, canonical_args)
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        """ 工具是否开启了缓存
+        """
+        return self.ttl.get(tool_name, 0) > 0
+
+    def get(self, key: tuple) -> tuple[bool, Any]:
+        """ 读取缓存
+
+        返回:
+            (是否命中, 结果)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expire_at, value = entry
+        if expire_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: tuple, value: Any, ttl: float) -> None:
+        """ 写入缓存，超出容量时淘汰最久未使用的条目
+        """
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, server_name: str | None = None, tool_name: str | None = None) -> None:
+        """ 清除缓存，可按服务器、工具过滤
+        """
+        if server_name is None and tool_name is None:
+            self._entries.clear()
+            return
+        for key in list(self._entries):
+            if server_name is not None and key[0] != server_name:
+                continue
+            if tool_name is not None and key[1] != tool_name:
+                continue
+            del self._entries[key]
+
+    async def get_or_call(
+        self,
+        server_name: str,
+        tool_name: str,
+        arguments: dict[str, Any],
+        call: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """ 优先返回缓存结果，否则执行 call 并缓存结果
+
+        参数:
+            server_name: 服务器名称
+            tool_name: 工具名称
+            arguments: 参数字典
+            call: 实际执行工具调用的协程函数
+        """
+        if not self.is_cacheable(tool_name):
+            return await call()
+
+        key = self.make_key(server_name, tool_name, arguments)
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        # 相同请求正在执行中，等待其结果
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await call()
+            # 工具返回错误时不缓存
+            if not getattr(result, "isError", False):
+                self.set(key, result, self.ttl[tool_name])
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.set_exception(RuntimeError(f"工具 {tool_name} 调用已取消"))
+            future.exception()  # 标记异常已读取，避免无人等待时告警
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """ 缓存统计信息
+        """
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,105 @@
+import json
+from contextlib import aclosing, asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from ..llm.llm_service import LLMService
+from .session_manager import AdmissionError, SessionManager
+
+
+def create_app(manager: SessionManager) -> Starlette:
+    """ 创建多会话 HTTP/WebSocket 服务
+
+    接口:
+        GET    /health                     服务状态
+        POST   /sessions                   创建会话，返回 {"session_id": ...}
+        DELETE /sessions/{session_id}      关闭会话
+        POST   /sessions/{session_id}/chat 发送消息 {"message": ...}，返回 {"response": ...}
+        WS     /sessions/{session_id}/ws   发送 {"message": ...}，逐条接收 {"event": ..., "data": ...}，
+                                           以 {"event": "done"} 结束
+    会话数已满或排队超时返回 503。
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        await manager.start()
+        try:
+            yield
+        finally:
+            await manager.stop()
+            await LLMService.close_shared_http_clients()
+
+    async def health(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok", **manager.stats})
+
+    async def create_session(request: Request) -> JSONResponse:
+        try:
+            session_id = await manager.create_session()
+        except AdmissionError as e:
+            return JSONResponse({"error": str(e)}, status_code=503)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+        return JSONResponse({"session_id": session_id}, status_code=201)
+
+    async def close_session(request: Request) -> JSONResponse:
+        if not await manager.close_session(request.path_params["session_id"]):
+            return JSONResponse({"error": "会话不存在"}, status_code=404)
+        return JSONResponse({"closed": True})
+
+    async def chat(request: Request) -> JSONResponse:
+        session_id = request.path_params["session_id"]
+        if session_id not in manager.sessions:
+            return JSONResponse({"error": "会话不存在"}, status_code=404)
+        try:
+            body = await request.json()
+            message = body["message"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return JSONResponse({"error": "请求体格式应为 {\"message\": ...}"}, status_code=400)
+        try:
+            response = await manager.chat(session_id, message)
+        except AdmissionError as e:
+            return JSONResponse({"error": str(e)}, status_code=503)
+        return JSONResponse({"response": response})
+
+    async def chat_ws(websocket: WebSocket) -> None:
+        session_id = websocket.path_params["session_id"]
+        if session_id not in manager.sessions:
+            await websocket.close(code=4404)
+            return
+        await websocket.accept()
+        try:
+            while True:
+                try:
+                    message = (await websocket.receive_json())["message"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    await websocket.send_json({"event": "error", "data": "消息格式应为 {\"message\": ...}"})
+                    continue
+                if session_id not in manager.sessions:
+                    await websocket.send_json({"event": "error", "data": "会话不存在"})
+                    await websocket.close(code=4404)
+                    return
+                try:
+                    # 客户端中途断开时关闭事件流，释放会话锁与并发名额
+                    async with aclosing(manager.chat_stream(session_id, message)) as stream:
+                        async for event, data in stream:
+                            await websocket.send_json({"event": event, "data": data})
+                except AdmissionError as e:
+                    await websocket.send_json({"event": "error", "data": str(e)})
+                await websocket.send_json({"event": "done"})
+        except WebSocketDisconnect:
+            pass
+
+    return Starlette(
+        routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/sessions", create_session, methods=["POST"]),
+            Route("/sessions/{session_id}", close_session, methods=["DELETE"]),
+            Route("/sessions/{session_id}/chat", chat, methods=["POST"]),
+            WebSocketRoute("/sessions/{session_id}/ws", chat_ws),
+        ],
+        lifespan=lifespan,
+    )
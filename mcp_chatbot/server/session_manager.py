@@ -0,0 +1,257 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..chat.chat_session import ChatSession
+from ..llm.llm_service import LLMService
+from ..mcp.mcp_client import MCPClient
+
+
+class AdmissionError(Exception):
+    """ 准入控制拒绝请求（会话数已满或并发请求排队超时）
+    """
+
+
+@dataclass
+class ManagedSession:
+    """ 受管理的聊天会话
+    """
+    session_id: str
+    chat_session: ChatSession
+    created_at: float = field(default_factory=time.monotonic)
+    last_active: float = field(default_factory=time.monotonic)
+    # 同一会话的请求串行执行，保证对话历史一致
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class SessionManager:
+    """ 多会话管理器
+
+    一个进程内服务多个用户的聊天会话：
+    - 所有会话共享同一组 MCP 服务器子进程与同一个 LLM 连接池
+    - 每个会话拥有独立的对话历史，同一会话的请求串行执行
+    - 准入控制：会话总数上限 max_sessions，同时处理的请求上限 max_concurrency，
+      排队超过 admission_timeout 秒的请求被拒绝
+    - 空闲超过 session_idle_timeout 秒的会话自动关闭
+    """
+    def __init__(
+        self,
+        clients: List[MCPClient],
+        llm_service: LLMService,
+        max_sessions: int = 100,
+        max_concurrency: int = 16,
+        admission_timeout: float = 5.0,
+        session_idle_timeout: float = 1800.0,
+        startup_timeout: float = 30.0,
+        session_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            clients: 共享的 MCP 服务器列表
+            llm_service: 共享的 LLM 服务
+            max_sessions: 最大会话数
+            max_concurrency: 同时处理的最大请求数
+            admission_timeout: 请求排队等待的最长时间（秒）
+            session_idle_timeout: 会话空闲超时时间（秒），<= 0 表示不过期
+            startup_timeout: 单个服务器启动超时时间（秒），可在服务器配置中通过 "startupTimeout" 覆盖
+            session_kwargs: 创建 ChatSession 时的额外参数，如 tool_call_mode、max_context_tokens
+        """
+        self.clients = clients
+        self.llm_service = llm_service
+        self.max_sessions = max_sessions
+        self.max_concurrency = max_concurrency
+        self.admission_timeout = admission_timeout
+        self.session_idle_timeout = session_idle_timeout
+        self.startup_timeout = startup_timeout
+        self.session_kwargs = session_kwargs or {}
+        # 启动成功的服务器
+        self.active_clients: List[MCPClient] = []
+        self.sessions: Dict[str, ManagedSession] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # 所有会话共享的服务器并发信号量，单服务器并发上限对全部会话生效
+        self._server_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self._in_flight: int = 0
+        # 正在初始化的会话数，与已创建的会话一起计入会话上限
+        self._pending_sessions: int = 0
+        self._rejected: int = 0
+
+    async def _start_client(self, client: MCPClient) -> None:
+        """ 启动单个服务器，按需启动的服务器有可用能力快照时推迟到第一次工具调用
+        """
+        if client.lazy and client.session is None and client.load_snapshot():
+            print(f"[SYS]: 服务器 {client.name} 使用能力快照，首次调用工具时启动")
+            return
+        timeout = client.config.get("startupTimeout", self.startup_timeout)
+        try:
+            async with asyncio.timeout(timeout):
+                await client.initialize()
+                await client.list_tools()
+        except TimeoutError:
+            await client.cleanup()
+            raise TimeoutError(f"启动超时（{timeout}s）")
+        except Exception:
+            await client.cleanup()
+            raise
+
+    async def start(self) -> None:
+        """ 并发启动所有服务器，并启动空闲会话清理任务
+        """
+        results = await asyncio.gather(
+            *[self._start_client(client) for client in self.clients],
+            return_exceptions=True
+        )
+        self.active_clients = []
+        for client, result in zip(self.clients, results):
+            if isinstance(result, BaseException):
+                print(f"[ERR]: 服务器 {client.name} 启动失败: {result}")
+                continue
+            print(f"[SYS]: 服务器 {client.name} 启动成功")
+            self.active_clients.append(client)
+        if not self.active_clients and self.clients:
+            raise RuntimeError("所有服务器均启动失败")
+
+        if self.session_idle_timeout > 0:
+            self._sweeper_task = asyncio.create_task(self._sweep_idle_sessions())
+
+    async def stop(self) -> None:
+        """ 关闭所有会话与服务器
+        """
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            self._sweeper_task = None
+        for session_id in list(self.sessions):
+            await self.close_session(session_id)
+        await asyncio.gather(
+            *[asyncio.create_task(client.cleanup()) for client in self.clients],
+            return_exceptions=True
+        )
+
+    async def create_session(self) -> str:
+        """ 创建新会话
+
+        Returns:
+            会话 ID
+        Raises:
+            AdmissionError: 会话数已达上限
+        """
+        # 在第一次 await 之前占用名额，避免并发创建时同时通过上限检查
+        if len(self.sessions) + self._pending_sessions >= self.max_sessions:
+            self._rejected += 1
+            raise AdmissionError(f"会话数已达上限 {self.max_sessions}")
+        self._pending_sessions += 1
+        try:
+            chat_session = ChatSession(
+                self.active_clients,
+                self.llm_service,
+                owns_clients=False,
+                server_semaphores=self._server_semaphores,
+                **self.session_kwargs
+            )
+            if not await chat_session.initialize():
+                raise RuntimeError("会话初始化失败")
+
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = ManagedSession(session_id, chat_session)
+            return session_id
+        finally:
+            self._pending_sessions -= 1
+
+    async def close_session(self, session_id: str) -> bool:
+        """ 关闭会话，会话不存在时返回 False
+        """
+        managed = self.sessions.pop(session_id, None)
+        if managed is None:
+            return False
+        await managed.chat_session.cleanup_clients()
+        return True
+
+    def get_session(self, session_id: str) -> ManagedSession:
+        """ 获取会话
+
+        Raises:
+            KeyError: 会话不存在
+        """
+        return self.sessions[session_id]
+
+    @asynccontextmanager
+    async def acquire(self, session_id: str) -> AsyncIterator[ChatSession]:
+        """ 在准入控制内独占使用会话
+
+        Raises:
+            KeyError: 会话不存在
+            AdmissionError: 排队超时
+        """
+        managed = self.get_session(session_id)
+        try:
+            async with asyncio.timeout(self.admission_timeout):
+                await self._semaphore.acquire()
+        except TimeoutError:
+            self._rejected += 1
+            raise AdmissionError(f"服务繁忙，请求排队超过 {self.admission_timeout}s")
+
+        self._in_flight += 1
+        try:
+            async with managed.lock:
+                managed.last_active = time.monotonic()
+                try:
+                    yield managed.chat_session
+                finally:
+                    managed.last_active = time.monotonic()
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    async def chat(self, session_id: str, message: str) -> str:
+        """ 发送消息并返回完整回复
+        """
+        async with self.acquire(session_id) as chat_session:
+            return await chat_session.get_llm_response_with_tool_call(message)
+
+    async def chat_stream(
+        self,
+        session_id: str,
+        message: str
+    ) -> AsyncGenerator[Tuple[str, str], None]:
+        """ 发送消息并以事件流返回回复，事件格式与 ChatSession.get_llm_response_stream_with_tool_call 一致
+        """
+        async with self.acquire(session_id) as chat_session:
+            stream = chat_session.get_llm_response_stream_with_tool_call(message)
+            try:
+                async for event in stream:
+                    yield event
+            finally:
+                await stream.aclose()
+
+    async def _sweep_idle_sessions(self) -> None:
+        """ 定期关闭空闲超时的会话
+        """
+        interval = max(1.0, min(60.0, self.session_idle_timeout / 2))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            expired = [
+                session_id
+                for session_id, managed in self.sessions.items()
+                if not managed.lock.locked()
+                and now - managed.last_active > self.session_idle_timeout
+            ]
+            for session_id in expired:
+                print(f"[SYS]: 会话 {session_id} 空闲超时，已关闭")
+                await self.close_session(session_id)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """ 服务状态统计
+        """
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rejected": self._rejected,
+            "servers": [client.name for client in self.active_clients],
+        }
@@ -1,7 +1,7 @@
 import asyncio
 import json
 
-from mcp_chatbot import Configuration, ChatSession, LLMService, MCPClient
+from mcp_chatbot import Configuration, ChatSession, LLMService, MCPClient, CapabilitySnapshot
 
 async def main() -> None:
     """主入口函数
@@ -10,9 +10,11 @@ async def main() -> None:
     config.print_config()
     server_config = config.load_config("config/server_config.json")  # 加载服务器配置
 
+    # 能力快照：配置未变化时直接使用上次的工具列表，服务器在首次调用工具时启动
+    snapshot = CapabilitySnapshot(config.snapshot_path) if config.snapshot_path else None
     servers = [
-        MCPClient(name, config)
-        for name, config in server_config["mcpServers"].items()  # 创建服务器实例
+        MCPClient(name, server, snapshot=snapshot)
+        for name, server in server_config["mcpServers"].items()  # 创建服务器实例
     ]
 
     llm_service = LLMService(
@@ -22,8 +24,11 @@ async def main() -> None:
         model_type=config.model_type,
     )
 
-    chat_session = ChatSession(servers, llm_service)
-    await chat_session.start()
+    chat_session = ChatSession(servers, llm_service, tool_call_mode=config.tool_call_mode)
+    try:
+        await chat_session.start()
+    finally:
+        await LLMService.close_shared_http_clients()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+import argparse
+import os
+
+import uvicorn
+
+from mcp_chatbot import Configuration, LLMService, MCPClient, SessionManager
+from mcp_chatbot.server.http_app import create_app
+
+
+def main() -> None:
+    """多会话服务入口函数
+    """
+    parser = argparse.ArgumentParser(description="tiny-mcp 多会话 HTTP/WebSocket 服务")
+    parser.add_argument("--host", default=os.getenv("CHAT_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("CHAT_SERVER_PORT", "8000")))
+    parser.add_argument("--max-sessions", type=int, default=int(os.getenv("CHAT_MAX_SESSIONS", "100")))
+    parser.add_argument("--max-concurrency", type=int, default=int(os.getenv("CHAT_MAX_CONCURRENCY", "16")))
+    parser.add_argument("--admission-timeout", type=float, default=float(os.getenv("CHAT_ADMISSION_TIMEOUT", "5")))
+    parser.add_argument("--session-idle-timeout", type=float, default=float(os.getenv("CHAT_SESSION_IDLE_TIMEOUT", "1800")))
+    args = parser.parse_args()
+
+    config = Configuration()
+    config.print_config()
+    server_config = config.load_config("config/server_config.json")  # 加载服务器配置
+
+    servers = [
+        MCPClient(name, server)
+        for name, server in server_config["mcpServers"].items()  # 创建共享的服务器实例
+    ]
+
+    # 所有会话共享同一个 LLM 服务及其连接池
+    llm_service = LLMService(
+        api_key=config.llm_api_key,
+        model_name=config.model_name,
+        base_url=config.base_url,
+        model_type=config.model_type,
+        max_connections=max(args.max_concurrency, 20),
+    )
+
+    manager = SessionManager(
+        servers,
+        llm_service,
+        max_sessions=args.max_sessions,
+        max_concurrency=args.max_concurrency,
+        admission_timeout=args.admission_timeout,
+        session_idle_timeout=args.session_idle_timeout,
+        session_kwargs={"tool_call_mode": config.tool_call_mode},
+    )
+    app = create_app(manager)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+simple_mcp_client.py 与 simple_mcp_client_stream.py 共用的资源内容缓存
+"""
+import os
+from collections import OrderedDict
+from typing import Optional
+
+
+class ResourceStore:
+    """ 资源内容缓存（LRU），总字符数不超过 max_chars，超出时淘汰最久未使用的资源
+    """
+    def __init__(self, max_chars: Optional[int] = None):
+        """
+        :param max_chars: 缓存的字符数上限，默认读取环境变量 RESOURCE_CACHE_CHARS（1000000）
+        """
+        if max_chars is None:
+            max_chars = int(os.getenv("RESOURCE_CACHE_CHARS", "1000000"))
+        self.max_chars = max_chars
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._size: int = 0
+
+    def get(self, name: str) -> Optional[str]:
+        text = self._items.get(name)
+        if text is not None:
+            self._items.move_to_end(name)
+        return text
+
+    def put(self, name: str, text: str) -> None:
+        if name in self._items:
+            self._size -= len(self._items.pop(name))
+        if len(text) > self.max_chars:  # 超过上限的单个资源不缓存
+            return
+        self._items[name] = text
+        self._size += len(text)
+        while self._size > self.max_chars:
+            _, evicted = self._items.popitem(last=False)
+            self._size -= len(evicted)
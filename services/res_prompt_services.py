@@ -1,21 +1,26 @@
 """ 
 Resources 和 Prompts MCP Service 示例
-Resources: MCP 的 markdown 文档
+Resources: MCP 的 markdown 文档（自动注册 DOCS_DIR 下的所有文本文件）
 Prompts: prompt template
+Tools: save_to_local（追加写入 OUTPUT_DIR 下的 JSONL 文件，由后台任务批量写入）
 """
 
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime
-import glob
+import gzip
 import json
+import mimetypes
+import mmap
 import os
-from typing import List
-from mcp import Resource
-from mcp.server.fastmcp import FastMCP
-from mcp.types import Resource, TextContent, EmbeddedResource
-
-
-# 初始化 FastMCP 服务器
-mcp = FastMCP("SesPromptService")
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.fastmcp.resources import Resource
 
 # 定义文档目录常量
 DOCS_DIR = "docs"
@@ -25,29 +30,301 @@ OUTPUT_DIR = "logs"
 os.makedirs(DOCS_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-@mcp.resource("mcp-doc://4.MCP规范协议.md", description="MCP documentation: 4.MCP规范协议.md")
-def get_mcp_protocol_doc() -> str:
-    """获取文档内容
-    
-    返回：
-        str: 文档内容
+# 作为文档资源注册的文件类型
+DOC_SUFFIXES = (".md", ".markdown", ".txt", ".rst")
+# 不小于该大小（字节）的文档使用 mmap，范围读取只访问需要的页
+MMAP_THRESHOLD = 1024 * 1024
+
+# save_to_local 写入参数: 队列长度（写满时调用方等待）、fsync 间隔（秒）、
+# 单个文件的轮转大小（字节，0 表示不轮转）、是否以 gzip 压缩写入
+SAVE_QUEUE_SIZE = int(os.getenv("SAVE_QUEUE_SIZE", "1000"))
+SAVE_FSYNC_INTERVAL = float(os.getenv("SAVE_FSYNC_INTERVAL", "1.0"))
+SAVE_ROTATE_BYTES = int(os.getenv("SAVE_ROTATE_BYTES", str(10 * 1024 * 1024)))
+SAVE_COMPRESS = os.getenv("SAVE_COMPRESS", "0").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class _CachedDoc:
+    """缓存的文档内容，mtime_ns/size 变化时失效"""
+    mtime_ns: int
+    size: int
+    data: Union[bytes, mmap.mmap]
+    text: Optional[str] = None  # 小文档的完整文本
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+class DocumentStore:
+    """文档缓存
+
+    - 小文档整体读入内存，大文档只读 mmap
+    - 每次读取前比较文件的修改时间与大小，文件变化后重新加载
+    - 支持按字节范围读取（按 UTF-8 字符边界对齐），大文档无需整体解码
     """
-    file_path = os.path.join(DOCS_DIR, "4.MCP规范协议.md")
-    return _read_file_content(file_path)
 
-@mcp.resource("mcp-doc://6.MCP核心交互流程.md", description="MCP documentation: 6.MCP核心交互流程.md")
-def get_mcp_interaction_doc() -> str:
-    """获取文档内容
-    
+    def __init__(self, root: str, mmap_threshold: int = MMAP_THRESHOLD):
+        """
+        参数：
+            root: 文档目录
+            mmap_threshold: 使用 mmap 的文件大小下限（字节）
+        """
+        self.root = os.path.abspath(root)
+        self.mmap_threshold = mmap_threshold
+        self._cache: dict[str, _CachedDoc] = {}
+
+    def list_documents(self) -> List[str]:
+        """列出目录下所有文本文档（相对路径，使用 / 分隔）"""
+        names = []
+        for directory, _, files in os.walk(self.root):
+            for file_name in files:
+                if file_name.lower().endswith(DOC_SUFFIXES):
+                    path = os.path.join(directory, file_name)
+                    names.append(os.path.relpath(path, self.root).replace(os.sep, "/"))
+        return sorted(names)
+
+    def _resolve(self, name: str) -> str:
+        """文档路径，不允许访问文档目录之外的文件"""
+        path = os.path.abspath(os.path.join(self.root, name))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"非法的文档路径: {name}")
+        return path
+
+    def _load(self, name: str) -> _CachedDoc:
+        path = self._resolve(name)
+        stat = os.stat(path)
+        cached = self._cache.get(name)
+        if cached is not None and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+            return cached
+        if cached is not None:
+            cached.close()
+
+        with open(path, "rb") as f:
+            if stat.st_size >= self.mmap_threshold:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = f.read()
+        doc = _CachedDoc(stat.st_mtime_ns, stat.st_size, data)
+        self._cache[name] = doc
+        return doc
+
+    def read(self, name: str) -> str:
+        """读取完整文档"""
+        doc = self._load(name)
+        if doc.text is not None:
+            return doc.text
+        text = doc.data[:].decode("utf-8")
+        if not isinstance(doc.data, mmap.mmap):
+            doc.text = text
+        return text
+
+    @staticmethod
+    def _char_boundary(data: Union[bytes, mmap.mmap], position: int, size: int) -> int:
+        """向后移动到 UTF-8 字符起点"""
+        while position < size and (data[position] & 0xC0) == 0x80:
+            position += 1
+        return position
+
+    def read_range(self, name: str, offset: int, length: int) -> Tuple[str, int, int, int]:
+        """按字节范围读取文档
+
+        参数：
+            name: 文档名称（相对路径）
+            offset: 起始字节偏移
+            length: 读取的字节数
+
+        返回：
+            (文本, 实际起点, 实际终点, 文档总字节数)，起点与终点按 UTF-8 字符边界对齐
+        """
+        doc = self._load(name)
+        start = self._char_boundary(doc.data, max(0, offset), doc.size)
+        end = self._char_boundary(doc.data, min(doc.size, start + max(0, length)), doc.size)
+        return doc.data[start:end].decode("utf-8"), start, end, doc.size
+
+
+class DocumentResource(Resource):
+    """从 DocumentStore 读取的文档资源"""
+    doc_name: str
+
+    async def read(self) -> str:
+        return DOCUMENTS.read(self.doc_name)
+
+
+DOCUMENTS = DocumentStore(DOCS_DIR)
+
+
+class JsonlSink:
+    """ 追加写入的 JSONL 记录，由后台任务批量写入
+
+    put 只把记录放入有界队列（队列满时等待，形成背压），后台任务一次取出队列中的所有记录，
+    按目标文件分组后在线程中追加写入；有未 fsync 的写入时，最迟 fsync_interval 秒后 fsync
+    （队列空闲时由计时器触发）。
+    文件超过 rotate_bytes 时重命名为 <名称>.<时间>.jsonl[.gz] 后写入新文件；
+    compress 为真时每批记录写为一个 gzip 成员（多个成员连接仍是合法的 gzip 文件）。
+    """
+    def __init__(
+        self,
+        root: str,
+        max_queue: int = SAVE_QUEUE_SIZE,
+        fsync_interval: float = SAVE_FSYNC_INTERVAL,
+        rotate_bytes: int = SAVE_ROTATE_BYTES,
+        compress: bool = SAVE_COMPRESS
+    ):
+        self.root = root
+        self.fsync_interval = fsync_interval
+        self.rotate_bytes = rotate_bytes
+        self.compress = compress
+        self._queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue(max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._last_fsync = time.monotonic()
+        # 有写入但尚未 fsync 的文件
+        self._dirty: set = set()
+
+    def path_for(self, file_name: str) -> str:
+        """ 记录写入的文件路径（只取文件名部分，不能写到 root 之外）
+        """
+        stem = os.path.splitext(os.path.basename(file_name))[0] or "records"
+        return os.path.join(self.root, stem + (".jsonl.gz" if self.compress else ".jsonl"))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, file_name: str, record: Dict[str, Any]) -> str:
+        """ 将记录放入写入队列，返回写入的文件路径
+        """
+        path = self.path_for(file_name)
+        await self._queue.put((path, record))
+        return path
+
+    async def close(self) -> None:
+        """ 写完队列中剩余的记录并 fsync
+        """
+        if self._task is not None:
+            await self._queue.join()
+            self._task.cancel()
+            self._task = None
+        await asyncio.to_thread(self._fsync)
+
+    async def _run(self) -> None:
+        while True:
+            # 有未 fsync 的写入时，最多等到距上次 fsync 满 fsync_interval 秒
+            timeout = None
+            if self._dirty:
+                timeout = max(0.0, self._last_fsync + self.fsync_interval - time.monotonic())
+            try:
+                record = await asyncio.wait_for(self._queue.get(), timeout)
+            except TimeoutError:
+                await asyncio.to_thread(self._fsync)
+                continue
+            batch = [record]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                print(f"[ERR]: 写入 {len(batch)} 条记录失败: {e}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        grouped: Dict[str, List[str]] = {}
+        for path, record in batch:
+            grouped.setdefault(path, []).append(json.dumps(record, ensure_ascii=False) + "\n")
+        for path, lines in grouped.items():
+            data = "".join(lines).encode("utf-8")
+            if self.compress:
+                data = gzip.compress(data)
+            self._rotate(path, len(data))
+            with open(path, "ab") as f:
+                f.write(data)
+            self._dirty.add(path)
+        if time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._fsync()
+
+    def _rotate(self, path: str, incoming: int) -> None:
+        if self.rotate_bytes <= 0 or not os.path.exists(path):
+            return
+        size = os.path.getsize(path)
+        if size == 0 or size + incoming <= self.rotate_bytes:
+            return
+        if path in self._dirty:
+            self._fsync_file(path)
+            self._dirty.discard(path)
+        base, suffix = path.split(".jsonl", 1)
+        os.replace(path, f"{base}.{datetime.now().strftime('%Y%m%d%H%M%S%f')}.jsonl{suffix}")
+
+    def _fsync(self) -> None:
+        dirty, self._dirty = self._dirty, set()
+        for path in dirty:
+            self._fsync_file(path)
+        self._last_fsync = time.monotonic()
+
+    @staticmethod
+    def _fsync_file(path: str) -> None:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+@asynccontextmanager
+async def service_lifespan(server: FastMCP) -> AsyncIterator[JsonlSink]:
+    """ 服务运行期间启动 save_to_local 的后台写入任务，退出前写完剩余记录
+    """
+    sink = JsonlSink(OUTPUT_DIR)
+    sink.start()
+    try:
+        yield sink
+    finally:
+        await sink.close()
+
+
+# 初始化 FastMCP 服务器
+mcp = FastMCP("SesPromptService", lifespan=service_lifespan)
+
+
+def register_documents() -> None:
+    """将文档目录下的每个文本文件注册为资源 mcp-doc://<相对路径>"""
+    for name in DOCUMENTS.list_documents():
+        mcp.add_resource(DocumentResource(
+            uri=f"mcp-doc://{quote(name)}",
+            description=f"MCP documentation: {name}",
+            mime_type=mimetypes.guess_type(name)[0] or "text/plain",
+            doc_name=name,
+        ))
+
+
+register_documents()
+
+
+@mcp.tool(description="分段读取文档内容，适用于较大的文档")
+def read_doc(name: str, offset: int = 0, length: int = 8192) -> str:
+    """按字节范围读取文档
+
+    参数：
+        name: 文档名称，如 4.MCP规范协议.md
+        offset: 起始字节偏移
+        length: 读取的字节数
+
     返回：
-        str: 文档内容
+        str: 文档片段，首行注明范围及下一段的 offset
     """
-    file_path = os.path.join(DOCS_DIR, "6.MCP核心交互流程.md")
-    return _read_file_content(file_path)
+    try:
+        text, start, end, size = DOCUMENTS.read_range(name, offset, length)
+    except (OSError, ValueError) as e:
+        return f"读取文档 {name} 失败: {str(e)}"
+    next_part = f"，下一段 offset={end}" if end < size else "，已到末尾"
+    return f"[{name} 字节 {start}-{end} / {size}{next_part}]\n{text}"
 
 @mcp.tool(description="保存问题和回答到本地文件")
-def save_to_local(file_name: str, question: str, answer: str) -> str:
-    """将问题和回答保存到本地文件
+async def save_to_local(file_name: str, question: str, answer: str, ctx: Context) -> str:
+    """将问题和回答追加保存到本地 JSONL 文件（同名文件的记录追加到 <文件名>.jsonl）
     
     参数：
         file_name: 保存的文件名
@@ -55,19 +332,16 @@ def save_to_local(file_name: str, question: str, answer: str) -> str:
         answer: 回答内容
     
     返回：
-        str: 保存成功的消息
+        str: 记录已加入写入队列的消息（由后台任务写入文件）
     """
+    sink: JsonlSink = ctx.request_context.lifespan_context
     data = {
         "question": question,
         "answer": answer,
         "timestamp": datetime.now().isoformat()
     }
-    
-    file_path = os.path.join(OUTPUT_DIR, file_name)
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    
-    return f"成功保存到: {file_path}"
+    file_path = await sink.put(file_name, data)
+    return f"已加入写入队列: {file_path}"
 
 
 @mcp.prompt(description="简洁回答的提示模板")
@@ -95,22 +369,6 @@ def detailed_response(question: str) -> str:
     """
     return f"请详细回答以下问题:\n\n{question}"
 
-def _read_file_content(file_path: str) -> str:
-    """读取文件内容的辅助函数
-    
-    参数：
-        file_path: 文件路径
-    
-    返回：
-        str: 文件内容
-    """
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
-    except Exception as e:
-        return f"读取文件 {file_path} 失败: {str(e)}"
-
-
 if __name__ == "__main__":
     # 以标准 I/O 方式运行 MCP 服务器
     mcp.run(transport='stdio')
\ No newline at end of file
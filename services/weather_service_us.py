@@ -1,26 +1,84 @@
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from typing import Any
+
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 
-mcp = FastMCP("weather")
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2，由 httpx[http2] 提供；未安装时退回 HTTP/1.1
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
 
 NWS_API_BASE = "https://api.weather.gov"
 USER_AGENT = "weather-app/1.0"
 
-async def make_nws_request(url: str) -> dict[str, Any] | None:
-    """ Make a request to the NWS API and return the response as a dict.
+# 缓存时间（秒）: 经纬度 -> 网格的映射基本不变，预报约每小时更新，预警变化较快
+POINTS_TTL = 24 * 3600
+FORECAST_TTL = 600
+ALERTS_TTL = 60
+# /points 坐标保留的小数位数（约 11 米），相近的坐标共享同一缓存
+COORD_PRECISION = 4
+# 缓存的最大响应数，超出时淘汰最久未使用的响应
+CACHE_MAX_ENTRIES = 1024
+
+
+@dataclass
+class NWSClient:
+    """ NWS API 客户端: 共享连接池 + 按 URL 的 TTL 缓存（LRU，最多 max_entries 个响应）
     """
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/geo+json"
-    }
-    async with httpx.AsyncClient() as client:
+    http_client: httpx.AsyncClient
+    max_entries: int = CACHE_MAX_ENTRIES
+    # URL -> (过期时间, 响应)，按最近使用排序
+    cache: OrderedDict[str, tuple[float, dict[str, Any]]] = field(default_factory=OrderedDict)
+
+    async def request(self, url: str, ttl: float = 0) -> dict[str, Any] | None:
+        """ Make a request to the NWS API and return the response as a dict.
+        Successful responses are cached for ttl seconds (ttl <= 0 disables caching).
+        """
+        cached = self.cache.get(url)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self.cache.move_to_end(url)
+                return cached[1]
+            del self.cache[url]
+
         try:
-            response = await client.get(url, headers=headers, timeout=30.0)
+            response = await self.http_client.get(url)
             response.raise_for_status()
-            return response.json()
+            data = response.json()
         except Exception:
             return None
+        if ttl > 0:
+            self.cache[url] = (time.monotonic() + ttl, data)
+            self.cache.move_to_end(url)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return data
+
+
+@asynccontextmanager
+async def nws_lifespan(server: FastMCP) -> AsyncIterator[NWSClient]:
+    """ 整个服务共享一个 keep-alive 连接池（安装 h2 时启用 HTTP/2）
+    """
+    async with httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        headers={
+            "User-Agent": USER_AGENT,
+            "Accept": "application/geo+json"
+        },
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+    ) as http_client:
+        yield NWSClient(http_client)
+
+
+mcp = FastMCP("weather", lifespan=nws_lifespan)
+
 
 def format_alert(feature: dict) -> str:
     """ Format an alert feature into a string.
@@ -35,38 +93,42 @@ Instructions: {props.get('instruction', 'No specific instructions provided')}
 """
 
 @mcp.tool()
-async def get_alerts(state: str) -> str:
+async def get_alerts(state: str, ctx: Context) -> str:
     """ get weather alerts for a US state.
     Args:
         state: Two-letter US state code (e.g. CA, NY)
     """
-    url = f"{NWS_API_BASE}/alerts/active/zone/{state}"
-    data = await make_nws_request(url)
+    nws: NWSClient = ctx.request_context.lifespan_context
+    url = f"{NWS_API_BASE}/alerts/active/zone/{state.upper()}"
+    data = await nws.request(url, ttl=ALERTS_TTL)
 
     if not data or "features" not in data:
         return "No active alerts for this state."
-    
+
     alerts = [format_alert(feature) for feature in data["features"]]
     return "\n---\n".join(alerts)
 
 @mcp.tool()
-async def get_forecast(latitude: float, longitude: float) -> str:
+async def get_forecast(latitude: float, longitude: float, ctx: Context) -> str:
     """Get weather forecast for a location.
 
     Args:
         latitude: Latitude of the location
         longitude: Longitude of the location
     """
-    # First get the forecast grid endpoint
+    nws: NWSClient = ctx.request_context.lifespan_context
+    # First get the forecast grid endpoint (cached for nearby coordinates)
+    latitude = round(latitude, COORD_PRECISION)
+    longitude = round(longitude, COORD_PRECISION)
     points_url = f"{NWS_API_BASE}/points/{latitude},{longitude}"
-    points_data = await make_nws_request(points_url)
+    points_data = await nws.request(points_url, ttl=POINTS_TTL)
 
     if not points_data:
         return "Unable to fetch forecast data for this location."
-    
+
     # Get the forecast URL from the points response
     forecast_url = points_data["properties"]["forecast"]
-    forecast_data = await make_nws_request(forecast_url)
+    forecast_data = await nws.request(forecast_url, ttl=FORECAST_TTL)
 
     if not forecast_data:
         return "Unable to fetch detailed forecast."
@@ -88,4 +150,4 @@ Forecast: {period['detailedForecast']}
 
 if __name__ == "__main__":
     # Initialize and run the server
-    mcp.run(transport='stdio')
\ No newline at end of file
+    mcp.run(transport='stdio')
@@ -1,7 +1,17 @@
 import os
+import re
+import sys
+import math
+import mmap
+import time
+import bisect
+import struct
+import asyncio
 import ujson
-import requests
-from typing import Tuple, Optional
+import httpx
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Tuple, Optional
 
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
@@ -12,91 +22,461 @@ from mcp.server.fastmcp import Context, FastMCP
 
 load_dotenv()
 
+
+class CityMatch(NamedTuple):
+    """城市匹配结果"""
+    name: str
+    province: str
+    code: str
+    score: float  # 1.0 为精确匹配
+
+
+class CityIndex:
+    """
+    城市名称索引（预编译的二进制文件，只读内存映射）
+    - 精确匹配: 有序键表上二分查找，O(log n)
+    - 前缀匹配: 同一有序键表，O(log n)
+    - 模糊匹配: 字符二元组（bigram）倒排表，按 Dice 系数排序
+    输入会去掉空格、大小写以及“市/县/区/city”等后缀后再查询，如“北京市”“Beijing City”均可命中“北京”。
+
+    索引由 build() 从城市 JSON 编译生成，运行时通过 mmap 直接读取，启动时无需解析 JSON、
+    也不构建 Python 字典；多个服务进程映射同一文件时共享操作系统页缓存。
+
+    文件布局（本机字节序，所有字段为 u32）:
+        头部      magic "CIDX", 版本, 条目数, 键数, bigram 数, 倒排项数, 字符串区长度
+        条目表    (名称偏移, 名称长度, 省份偏移, 省份长度, 代码偏移, 代码长度) x 条目数
+        键表      (键偏移, 键长度, 条目编号, bigram 数) x 键数，按 UTF-8 字节序排列
+        bigram 表 (bigram 偏移, bigram 长度, 倒排起点, 倒排长度) x bigram 数，按 UTF-8 字节序排列
+        倒排区    键编号（升序）
+        字符串区  UTF-8 字符串，偏移为相对文件起点的绝对偏移
+    """
+
+    __slots__ = ['_buffer', '_entries', '_keys', '_grams', '_postings', '_entry_count', '_key_count', '_gram_count']
+
+    MAGIC = b"CIDX"
+    VERSION = 2
+    _HEADER = struct.Struct("=4s6I")
+    _ENTRY_FIELDS = 6
+    _KEY_FIELDS = 4
+    _GRAM_FIELDS = 4
+
+    # 查询时去掉的行政区划后缀（整体未命中时才去掉）
+    SUFFIXES = ("自治州", "自治县", "地区", "市", "县", "区", "省", "盟", "旗", "city", "county", "district")
+    _STRIP_RE = re.compile(r"[\s'’·\-_.]+")
+
+    def __init__(self, buffer: Any):
+        """
+        :param buffer: 索引内容（mmap 或 build() 返回的 bytes）
+        """
+        if len(buffer) < self._HEADER.size:
+            raise ValueError("城市索引文件不完整")
+        magic, version, entry_count, key_count, gram_count, posting_count, _ = self._HEADER.unpack_from(buffer, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("城市索引格式或版本不兼容")
+        tables_size = 4 * (
+            entry_count * self._ENTRY_FIELDS + key_count * self._KEY_FIELDS
+            + gram_count * self._GRAM_FIELDS + posting_count
+        )
+        if self._HEADER.size + tables_size > len(buffer):
+            raise ValueError("城市索引文件不完整")
+        self._buffer = buffer
+        self._entry_count = entry_count
+        self._key_count = key_count
+        self._gram_count = gram_count
+
+        view = memoryview(buffer)
+        offset = self._HEADER.size
+        sections = []
+        for count in (
+            entry_count * self._ENTRY_FIELDS,
+            key_count * self._KEY_FIELDS,
+            gram_count * self._GRAM_FIELDS,
+            posting_count
+        ):
+            sections.append(view[offset:offset + count * 4].cast("I"))
+            offset += count * 4
+        self._entries, self._keys, self._grams, self._postings = sections
+
+    @classmethod
+    def open(cls, path: str) -> "CityIndex":
+        """只读映射索引文件"""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def build(cls, cities: List[Dict[str, str]]) -> bytes:
+        """
+        将城市列表编译为索引
+        :param cities: 城市列表，每项包含 cityName、cityPinyin、province、cityCode
+        :return: 索引内容
+        """
+        entries: List[Tuple[str, str, str]] = []
+        index: Dict[str, int] = {}
+        for city in cities:
+            entry_id = len(entries)
+            entries.append((city["cityName"].strip(), city["province"], city["cityCode"]))
+            for key in (cls.normalize(city["cityName"]), cls.normalize(city["cityPinyin"])):
+                if key:
+                    index[key] = entry_id
+        keys = sorted(index, key=lambda key: key.encode("utf-8"))
+        postings: Dict[str, List[int]] = {}
+        for key_id, key in enumerate(keys):
+            for gram in cls._bigrams(key):
+                postings.setdefault(gram, []).append(key_id)
+        grams = sorted(postings, key=lambda gram: gram.encode("utf-8"))
+        posting_count = sum(len(ids) for ids in postings.values())
+
+        strings_offset = cls._HEADER.size + 4 * (
+            len(entries) * cls._ENTRY_FIELDS
+            + len(keys) * cls._KEY_FIELDS
+            + len(grams) * cls._GRAM_FIELDS
+            + posting_count
+        )
+        strings = bytearray()
+        interned: Dict[str, Tuple[int, int]] = {}
+
+        def intern(text: str) -> Tuple[int, int]:
+            if text not in interned:
+                data = text.encode("utf-8")
+                interned[text] = (strings_offset + len(strings), len(data))
+                strings.extend(data)
+            return interned[text]
+
+        entry_table = array("I")
+        for name, province, code in entries:
+            entry_table.extend((*intern(name), *intern(province), *intern(code)))
+        key_table = array("I")
+        for key in keys:
+            key_table.extend((*intern(key), index[key], len(cls._bigrams(key))))
+        gram_table = array("I")
+        posting_table = array("I")
+        for gram in grams:
+            gram_table.extend((*intern(gram), len(posting_table), len(postings[gram])))
+            posting_table.extend(postings[gram])
+
+        header = cls._HEADER.pack(
+            cls.MAGIC, cls.VERSION, len(entries), len(keys), len(grams), posting_count, len(strings)
+        )
+        return b"".join((
+            header, entry_table.tobytes(), key_table.tobytes(),
+            gram_table.tobytes(), posting_table.tobytes(), bytes(strings)
+        ))
+
+    @classmethod
+    def compile(cls, json_path: str, index_path: str) -> None:
+        """从城市 JSON 编译索引文件（先写临时文件再替换，正在映射旧文件的进程不受影响）"""
+        with open(json_path, 'rb') as f:  # 二进制模式读取更快
+            data = ujson.load(f)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(cls.build(data))
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        """统一大小写并去掉空白与分隔符"""
+        return cls._STRIP_RE.sub("", text.strip().lower())
+
+    @staticmethod
+    def _bigrams(key: str) -> frozenset:
+        padded = f"^{key}$"
+        return frozenset(padded[i:i + 2] for i in range(len(padded) - 1))
+
+    def _string(self, offset: int, length: int) -> bytes:
+        return self._buffer[offset:offset + length]
+
+    def _key(self, key_id: int) -> bytes:
+        base = key_id * self._KEY_FIELDS
+        return self._string(self._keys[base], self._keys[base + 1])
+
+    def _key_entry(self, key_id: int) -> int:
+        return self._keys[key_id * self._KEY_FIELDS + 2]
+
+    def _bisect_keys(self, key: bytes) -> int:
+        """第一个不小于 key 的键编号"""
+        low, high = 0, self._key_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _find_key(self, key: str) -> Optional[int]:
+        """精确查找键，返回条目编号"""
+        data = key.encode("utf-8")
+        key_id = self._bisect_keys(data)
+        if key_id < self._key_count and self._key(key_id) == data:
+            return self._key_entry(key_id)
+        return None
+
+    def _gram_postings(self, gram: str) -> Any:
+        """bigram 的倒排表（键编号），不存在时返回空序列"""
+        data = gram.encode("utf-8")
+        low, high = 0, self._gram_count
+        while low < high:
+            mid = (low + high) // 2
+            base = mid * self._GRAM_FIELDS
+            current = self._string(self._grams[base], self._grams[base + 1])
+            if current == data:
+                start, count = self._grams[base + 2], self._grams[base + 3]
+                return self._postings[start:start + count]
+            if current < data:
+                low = mid + 1
+            else:
+                high = mid
+        return ()
+
+    def _variants(self, city_input: str) -> List[str]:
+        """查询键及去掉行政区划后缀后的键"""
+        key = self.normalize(city_input)
+        variants = [key] if key else []
+        for suffix in self.SUFFIXES:
+            if key.endswith(suffix) and len(key) > len(suffix):
+                variants.append(key[:-len(suffix)])
+                break
+        return variants
+
+    def _match(self, entry_id: int, score: float) -> CityMatch:
+        base = entry_id * self._ENTRY_FIELDS
+        fields = self._entries[base:base + self._ENTRY_FIELDS]
+        name, province, code = (
+            self._string(fields[i], fields[i + 1]).decode("utf-8") for i in (0, 2, 4)
+        )
+        return CityMatch(name, province, code, score)
+
+    def lookup(self, city_input: str) -> Optional[CityMatch]:
+        """
+        精确匹配（含去后缀），未命中时返回 None
+        时间复杂度: O(log n)
+        """
+        for key in self._variants(city_input):
+            entry_id = self._find_key(key)
+            if entry_id is not None:
+                return self._match(entry_id, 1.0)
+        return None
+
+    def search(self, city_input: str, limit: int = 5, min_score: float = 0.5) -> List[CityMatch]:
+        """
+        按相似度返回候选城市
+        :param city_input: 支持中文或拼音，可带“市”等后缀或存在拼写错误
+        :param limit: 最多返回的候选数
+        :param min_score: 最低相似度
+        :return: 按相似度从高到低排序的候选列表
+        """
+        scores: Dict[int, float] = {}
+
+        def add(entry_id: int, score: float) -> None:
+            if score > scores.get(entry_id, 0.0):
+                scores[entry_id] = score
+
+        for key in self._variants(city_input):
+            # 前缀匹配（含精确匹配）: 输入越接近完整名称分数越高
+            data = key.encode("utf-8")
+            start = self._bisect_keys(data)
+            for key_id in range(start, min(start + 200, self._key_count)):
+                candidate = self._key(key_id)
+                if not candidate.startswith(data):
+                    break
+                add(self._key_entry(key_id), 0.5 + 0.5 * len(data) / len(candidate))
+
+            # 模糊匹配: bigram Dice 系数
+            # 前缀过滤: Dice >= min_score 要求至少共享 min_common 个 bigram，
+            # 因此候选必然出现在最稀有的 len(grams) - min_common + 1 个 bigram 中，高频 bigram 无需遍历
+            grams = self._bigrams(key)
+            min_common = max(1, math.ceil(min_score * len(grams) / (2 - min_score)))
+            gram_postings = sorted((self._gram_postings(gram) for gram in grams), key=len)
+            rare_count = len(grams) - min_common + 1
+            common = Counter()
+            for postings in gram_postings[:rare_count]:
+                common.update(postings)
+            # 高频 bigram 只对候选做成员检查（倒排表升序，二分查找）
+            frequent = gram_postings[rare_count:]
+            for key_id, count in common.items():
+                total = len(grams) + self._keys[key_id * self._KEY_FIELDS + 3]
+                # 即使高频 bigram 全部命中也达不到 min_score 的候选直接跳过
+                if 2.0 * (count + len(frequent)) / total < min_score:
+                    continue
+                for postings in frequent:
+                    position = bisect.bisect_left(postings, key_id)
+                    if position < len(postings) and postings[position] == key_id:
+                        count += 1
+                score = 2.0 * count / total
+                if score >= min_score:
+                    add(self._key_entry(key_id), score)
+
+        ranked = sorted(
+            (item for item in scores.items() if item[1] >= min_score),
+            key=lambda item: (-item[1], item[0])
+        )
+        return [self._match(entry_id, round(score, 3)) for entry_id, score in ranked[:limit]]
+
+    def best_match(self, city_input: str, min_score: float = 0.6) -> Optional[CityMatch]:
+        """精确匹配优先，否则返回相似度最高的候选"""
+        match = self.lookup(city_input)
+        if match is not None:
+            return match
+        candidates = self.search(city_input, limit=1, min_score=min_score)
+        return candidates[0] if candidates else None
+
+    def lookup_many(self, city_inputs: List[str]) -> List[Optional[CityMatch]]:
+        """批量查询，结果与输入一一对应"""
+        return [self.best_match(city_input) for city_input in city_inputs]
+
+    def __len__(self) -> int:
+        return self._entry_count
+
+
+def city_index_path(json_path: str) -> str:
+    """城市索引文件路径: 环境变量 CITY_INDEX_PATH，默认与 JSON 同名的 .idx 文件"""
+    return os.getenv("CITY_INDEX_PATH") or os.path.splitext(json_path)[0] + ".idx"
+
+
 class CityWeather:
     """
     城市信息高效查询类
     功能特点：
     - 初始化时自动加载并索引JSON数据
-    - 支持中文和拼音双模式查询
-    - 毫秒级响应速度（基于哈希索引）
+    - 支持中文和拼音双模式查询，支持前缀与模糊匹配（见 CityIndex）
+    - 微秒级响应速度，预编译索引通过内存映射加载，启动无需解析 JSON，多进程共享内存
     - 内存优化设计
+    - 共享的异步 HTTP 连接池，按城市代码缓存实时天气，同一城市的并发请求合并为一次
     """
     
-    __slots__ = ['_index', 'weather_url', 'weather_key']  # 内存优化
+    __slots__ = [
+        '_index', 'weather_url', 'weather_key', 'cache_ttl',
+        '_client', '_cache', '_inflight'
+    ]  # 内存优化
 
     def __init__(
             self,
             weather_url: str,
             weather_key: str,
-            city_json_path: str
+            city_json_path: str,
+            http_client: httpx.AsyncClient,
+            cache_ttl: float = 600.0
         ):
         """
         初始化加载城市数据
         :param json_path: JSON文件路径
+        :param http_client: 共享的异步 HTTP 客户端（由生命周期管理器创建和关闭）
+        :param cache_ttl: 实时天气缓存时间（秒），与上游数据更新间隔一致，<= 0 表示不缓存
         """
         self.weather_url = weather_url
         self.weather_key = weather_key
-        self._index = {}
+        self.cache_ttl = cache_ttl
+        self._client = http_client
+        # 城市代码 -> (过期时间, 实时天气)
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # 城市代码 -> 进行中的请求，同一城市的并发请求共享结果
+        self._inflight: Dict[str, asyncio.Task] = {}
         if not self.weather_key:
             raise ValueError("必须配置WEATHER_API_KEY环境变量")
         self._load_and_index(city_json_path)
 
     def _load_and_index(self, path: str):
         """
-        高性能数据加载和索引构建
-        时间复杂度: O(n)
+        加载预编译的城市索引（只读内存映射），索引不存在或比 JSON 旧时先重新编译，
+        索引文件损坏或版本不兼容时重新编译并替换，之后启动不再重复编译
         """
-        with open(path, 'rb') as f:  # 二进制模式读取更快
-            data = ujson.load(f)
-            
-        # 并行构建索引
-        for city in data:
-            name_key = city["cityName"].strip().lower()
-            pinyin_key = city["cityPinyin"].strip().lower()
-            value = (city["province"], city["cityCode"])
-            
-            # 同时建立中文和拼音索引
-            self._index[name_key] = value
-            self._index[pinyin_key] = value
+        index_path = city_index_path(path)
+        try:
+            if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(path):
+                CityIndex.compile(path, index_path)
+            try:
+                self._index = CityIndex.open(index_path)
+            except (OSError, ValueError) as e:
+                print(f"城市索引不可用，重新编译: {e}", file=sys.stderr)
+                CityIndex.compile(path, index_path)
+                self._index = CityIndex.open(index_path)
+        except (OSError, ValueError) as e:
+            # 索引文件不可写或格式不兼容时在内存中编译（stdout 为 stdio 传输通道，日志写到 stderr）
+            print(f"城市索引不可用，改为内存编译: {e}", file=sys.stderr)
+            with open(path, 'rb') as f:  # 二进制模式读取更快
+                self._index = CityIndex(CityIndex.build(ujson.load(f)))
 
     def get_city_info(self, city_input: str) -> Tuple[Optional[str], Optional[str]]:
         """
         获取城市信息（线程安全）
-        :param city_input: 支持中文或拼音（不区分大小写）
+        :param city_input: 支持中文或拼音（不区分大小写），未精确命中时使用最相似的城市
         :return: (省份, 城市代码) 元组
-        时间复杂度: O(1)
         """
-        key = city_input.strip().lower()
-        return self._index.get(key, (None, None))
+        match = self._index.best_match(city_input)
+        return (match.province, match.code) if match else (None, None)
+
+    def search_cities(self, city_inputs: List[str], limit: int = 5) -> Dict[str, List[CityMatch]]:
+        """
+        批量查询候选城市
+        :param city_inputs: 城市名称列表
+        :param limit: 每个输入最多返回的候选数
+        :return: 输入 -> 候选列表
+        """
+        return {city_input: self._index.search(city_input, limit) for city_input in city_inputs}
 
     @property
     def total_cities(self) -> int:
-        """获取索引城市总数（去重计数）"""
-        return len(self._index) // 2
+        """获取索引城市总数"""
+        return len(self._index)
     
-    def get_weather(self, location: str) -> str:
+    async def _request_now(self, city_id: str) -> Dict[str, Any]:
+        """
+        请求实时天气，成功的响应写入缓存
+        """
+        response = await self._client.get(
+            f"{self.weather_url}/v7/weather/now",
+            params={"location": city_id},
+            headers={"X-QW-Api-Key": self.weather_key}
+        )
+        response.raise_for_status()  # 自动处理4xx/5xx错误
+        # 解析JSON响应（httpx自动处理gzip解码）
+        data = response.json()
+        if data.get("code") == "200" and self.cache_ttl > 0:
+            self._cache[city_id] = (time.monotonic() + self.cache_ttl, data)
+        return data
+
+    async def fetch_now(self, city_id: str) -> Dict[str, Any]:
+        """
+        获取实时天气（优先使用缓存）
+        :param city_id: 城市代码
+        :return: 接口响应
+        """
+        cached = self._cache.get(city_id)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                return cached[1]
+            del self._cache[city_id]
+
+        task = self._inflight.get(city_id)
+        if task is None:
+            task = asyncio.create_task(self._request_now(city_id))
+            self._inflight[city_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(city_id, None))
+        # 单个调用方被取消时不影响共享同一请求的其他调用方
+        return await asyncio.shield(task)
+
+    async def get_weather(self, location: str) -> str:
         try:
-            province, city_id = self.get_city_info(location)
-            url = f"{self.weather_url}/v7/weather/now"
-            params = {
-                "location": city_id  # 北京城市代码
-            }
-            headers = {
-                "X-QW-Api-Key": self.weather_key
-            }
-
-        
-            # 发送带压缩支持的GET请求
-            response = requests.get(url, headers=headers, params=params)     
-            response.raise_for_status()  # 自动处理4xx/5xx错误   
-            # 解析压缩后的JSON响应（requests自动处理gzip解码）
-            data = response.json()
-
-            print(data)
-            
+            match = self._index.best_match(location)
+            if match is None:
+                candidates = self._index.search(location, limit=5, min_score=0.3)
+                if candidates:
+                    return f"未找到城市: {location}，相近的城市: {'、'.join(c.name for c in candidates)}"
+                return f"未找到城市: {location}"
+            # 非精确匹配时注明实际查询的城市，便于发现匹配错误
+            note = "" if match.score >= 1.0 else f"（未找到“{location}”，按最相近的城市“{match.name}”查询）\n"
+            province, city_id, location = match.province, match.code, match.name
+
+            data = await self.fetch_now(city_id)
+
             # 示例数据解析（根据实际响应结构调整）
             if data["code"] == "200":
-                return f"""中国{province}省{location}市天气查询成功：
+                return note + f"""中国{province}省{location}市天气查询成功：
                 天气情况：{data['now']['text']}
                 温度：{data['now']['temp']}°C
                 体感温度：{data['now']['feelsLike']}°C
@@ -111,9 +491,9 @@ class CityWeather:
             else:
                 return f"API错误: {data['code']} - {data['message']}"
 
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             return f"HTTP错误: {e.response.status_code}"
-        except requests.exceptions.JSONDecodeError:
+        except ValueError:
             return "响应解析失败"
         except Exception as e:
             return  f"请求异常: {str(e)}"
@@ -128,16 +508,23 @@ async def mcp_lifespan(server: FastMCP) -> AsyncIterator[MCPContext]:
     """ MCP 生命周期管理器
     """
     try:
-        weather_cxt = CityWeather(
-            weather_url=os.getenv("WEATHER_API_URL", ""),
-            weather_key=os.getenv("WEATHER_API_KEY", ""),
-            city_json_path=os.getenv("CITY_JSON_PATH", "")
-        )
+        # 整个服务共享一个连接池，复用与天气接口的 keep-alive 连接
+        async with httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        ) as http_client:
+            weather_cxt = CityWeather(
+                weather_url=os.getenv("WEATHER_API_URL", ""),
+                weather_key=os.getenv("WEATHER_API_KEY", ""),
+                city_json_path=os.getenv("CITY_JSON_PATH", ""),
+                http_client=http_client,
+                cache_ttl=float(os.getenv("WEATHER_CACHE_TTL", "600"))
+            )
 
-        # 进入服务
-        yield MCPContext(
-            weather_cxt=weather_cxt
-        )
+            # 进入服务
+            yield MCPContext(
+                weather_cxt=weather_cxt
+            )
     except Exception as e:
         print(f"初始化失败: {str(e)}")
         raise
@@ -159,25 +546,58 @@ async def get_weather(location: str, ctx: Context) -> str:
     :param location: 城市名称（支持中文或拼音）
     :return: 天气情况（JSON格式）
     """
-    location = location.replace("市", "")
     weather_cxt = ctx.request_context.lifespan_context.weather_cxt
-    return weather_cxt.get_weather(location)
+    return await weather_cxt.get_weather(location)
+
+@mcp.tool(name="get_weather_batch", description="批量查询多个城市的天气情况")
+async def get_weather_batch(locations: List[str], ctx: Context) -> str:
+    """批量查询天气情况，一次调用返回所有城市的结果
+    :param locations: 城市名称列表（支持中文或拼音）
+    :return: 各城市的天气情况
+    """
+    weather_cxt = ctx.request_context.lifespan_context.weather_cxt
+    results = await asyncio.gather(*[weather_cxt.get_weather(location) for location in locations])
+    return "\n\n".join(results)
+
+@mcp.tool(name="search_city", description="查询城市名称对应的候选城市（支持前缀、拼音与模糊匹配）")
+async def search_city(names: List[str], ctx: Context) -> str:
+    """批量查询候选城市
+    :param names: 城市名称列表
+    :return: 每个名称的候选城市（名称、省份、城市代码、相似度）
+    """
+    weather_cxt = ctx.request_context.lifespan_context.weather_cxt
+    results = weather_cxt.search_cities(names)
+    return ujson.dumps(
+        {name: [match._asdict() for match in matches] for name, matches in results.items()},
+        ensure_ascii=False
+    )
 
 if __name__ == "__main__":
-    mcp.run(transport='stdio')
+    # python weather_service_zh.py build-index [城市JSON路径]  预先编译城市索引
+    if len(sys.argv) > 1 and sys.argv[1] == "build-index":
+        json_path = sys.argv[2] if len(sys.argv) > 2 else os.getenv("CITY_JSON_PATH", "")
+        CityIndex.compile(json_path, city_index_path(json_path))
+        print(f"城市索引已生成: {city_index_path(json_path)}")
+    else:
+        mcp.run(transport='stdio')
 
 # # 使用示例
+# async def main():
+#     async with httpx.AsyncClient() as http_client:
+#         # 初始化（假设文件大小为2MB，约2000城市）
+#         city_weather = CityWeather(
+#                 weather_url=os.getenv("WEATHER_API_URL", ""),
+#                 weather_key=os.getenv("WEATHER_API_KEY", ""),
+#                 city_json_path=os.getenv("CITY_JSON_PATH", ""),
+#                 http_client=http_client
+#             )
+
+#         # 测试查询
+#         test_cases = ["北京", "beijing", "Chaoyang", "未知城市"]
+#         for case in test_cases:
+#             weather_str = await city_weather.get_weather(case)
+#             print(f"查询结果: {weather_str}")
+#             print("--------------------------")
+
 # if __name__ == "__main__":
-#     # 初始化（假设文件大小为2MB，约2000城市）
-#     city_weather = CityWeather(
-#             weather_url=os.getenv("WEATHER_API_URL", ""),
-#             weather_key=os.getenv("WEATHER_API_KEY", ""),
-#             city_json_path=os.getenv("CITY_JSON_PATH", "")
-#         )
-    
-#     # 测试查询
-#     test_cases = ["北京", "beijing", "Chaoyang", "未知城市"]
-#     for case in test_cases:
-#         weather_str = city_weather.get_weather(case)
-#         print(f"查询结果: {weather_str}")
-#         print("--------------------------")
\ No newline at end of file
+#     asyncio.run(main())
\ No newline at end of file
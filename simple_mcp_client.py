@@ -3,6 +3,7 @@ import os
 import sys
 import json
 from contextlib import AsyncExitStack
+from urllib.parse import unquote
 from typing import Optional, List, Dict, Any
 
 from mcp import ClientSession, StdioServerParameters
@@ -10,6 +11,8 @@ from mcp.client.stdio import stdio_client
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from resource_store import ResourceStore
+
 load_dotenv()
 
 class MCPClient:
@@ -39,8 +42,9 @@ class MCPClient:
         self._cleanup_lock: asyncio.Lock = asyncio.Lock()
 
         self.available_tools: List[Dict[str, Any]] = []
-        # {resources_name: resources}
-        self.resources_dict = {}
+        # 资源名称列表，内容在首次匹配时读取，只在有限大小的缓存中保留
+        self.resource_names: List[str] = []
+        self.resource_store = ResourceStore()
         # {promts_name, description}
         self.prompts_dict = {}
 
@@ -131,14 +135,11 @@ class MCPClient:
         ]
         print(f"[SYS]: 可用工具: {[t['function']['name'] for t in self.available_tools]}")
 
-        # 获取资源列表
+        # 获取资源列表（内容在首次匹配时读取）
         resources_response = await self.session.list_resources()
-        resources_names = [resource.name for resource in resources_response.resources]
-        for resource_name in resources_names:
-            resource = await self.session.read_resource(resource_name)
-            self.resources_dict[resource_name] = resource.contents[0].text
+        self.resource_names = [resource.name for resource in resources_response.resources]
 
-        print(f"[SYS]: 可用资源: {resources_names}")
+        print(f"[SYS]: 可用资源: {self.resource_names}")
 
         prompts_response = await self.session.list_prompts()
         prompts_names = []
@@ -187,13 +188,16 @@ class MCPClient:
             "MCP": ["mcp-doc://4.MCP规范协议.md", "mcp-doc://6.MCP核心交互流程.md"],
         }
 
+        # 资源名称中的非 ASCII 字符是百分号编码的，解码后再与关键字表比较
+        names = {unquote(name): name for name in self.resource_names}
+
         # 关键字匹配查找
         matched_resources = []
         for keyword, resources in keywords_map.items():
             if keyword in user_question:
                 for resource in resources:
                     if (
-                        resource in self.resources_dict
+                        resource in names
                         and resource not in matched_resources
                     ):
                         matched_resources.append(resource)
@@ -202,15 +206,28 @@ class MCPClient:
         if not matched_resources:
             return user_question
         
-        # 构建增强的问题
+        # 并发读取匹配到的资源，构建增强的问题
+        texts = await asyncio.gather(
+            *[self._read_resource(names[resource]) for resource in matched_resources]
+        )
         context_parts = []
-        for resource in matched_resources:
-            context_parts.append(f"--- {resource} ---\n{self.resources_dict[resource]}")
+        for resource, text in zip(matched_resources, texts):
+            context_parts.append(f"--- {resource} ---\n{text}")
 
         return (
             user_question + "\n\n相关信息:\n\n" + "\n\n".join(context_parts)
         )
 
+    async def _read_resource(self, name: str) -> str:
+        """ 读取资源内容（优先使用缓存）
+        """
+        text = self.resource_store.get(name)
+        if text is None:
+            resource = await self.session.read_resource(name)
+            text = getattr(resource.contents[0], "text", "") if resource.contents else ""
+            self.resource_store.put(name, text)
+        return text
+
     async def process_query(self, query: str) -> str:
         """处理查询
         """
@@ -225,7 +242,7 @@ class MCPClient:
             print(f"[LOG]: 选择的提示模板: {template_name} \n")
 
         # 2.添加相关资源
-        if self.resources_dict:
+        if self.resource_names:
             user_text = await self.add_relevant_resources(user_text)
 
         # 3.消息格式
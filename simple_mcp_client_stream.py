@@ -3,7 +3,11 @@ import re
 import os
 import sys
 import json
+import math
+import time
+import hashlib
 from contextlib import AsyncExitStack
+from urllib.parse import unquote
 from typing import Optional, List, Dict, Any
 
 from mcp import ClientSession, StdioServerParameters
@@ -11,11 +15,154 @@ from mcp.client.stdio import stdio_client
 from openai import AsyncOpenAI
 from dotenv import load_dotenv, dotenv_values
 
+from resource_store import ResourceStore
+
 load_dotenv(
     dotenv_path=".env", 
     override=True
 )
 
+# 服务器能力快照（工具/资源/Prompt），空字符串表示不使用快照
+SNAPSHOT_PATH = os.getenv("MCP_SNAPSHOT_PATH_SIMPLE", ".cache/simple_mcp_client_snapshot.json")
+
+# 资源检索参数：每次最多注入的片段数与 token 预算
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "4"))
+RAG_TOKEN_BUDGET = int(os.getenv("RAG_TOKEN_BUDGET", "1500"))
+# 后台并发读取资源的并发数
+RESOURCE_READ_CONCURRENCY = 4
+# 每个问题最多执行的工具调用轮数（每轮可并发调用多个工具）
+MAX_TOOL_STEPS = int(os.getenv("MAX_TOOL_STEPS", "5"))
+
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff\u3400-\u4dbf\uf900-\ufaff]+")
+_WORD = re.compile(r"[a-z0-9_]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """ 估算 token 数：中日韩字符按 1 个 token，其余按 4 个字符 1 个 token
+    """
+    cjk_count = sum(len(run) for run in _CJK_RUN.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+
+def tokenize(text: str) -> List[str]:
+    """ 检索分词：英文/数字按单词，中文按字符二元组（单字词保留单字），无需分词词典
+    """
+    text = text.lower()
+    terms = _WORD.findall(text)
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+class ResourceRetriever:
+    """ 资源检索（BM25，离线）
+
+    资源按 markdown 标题与段落切分为片段并建立倒排索引，可在后台逐个资源增量添加；
+    查询时只返回最相关的 top_k 个片段，且总长度不超过 token_budget。
+    索引只保存片段位置（资源名称, 片段序号）与词频，不保存资源文本，
+    片段文本在需要时由资源文本重新切分得到（切分是确定性的）。
+    """
+    def __init__(self, max_chunk_chars: int = 600, k1: float = 1.5, b: float = 0.75):
+        self.max_chunk_chars = max_chunk_chars
+        self.k1 = k1
+        self.b = b
+        # 片段: (资源名称, 片段序号, token 数)
+        self.chunks: List[tuple] = []
+        self._lengths: List[int] = []
+        # term -> [(片段编号, 词频)]
+        self._postings: Dict[str, List[tuple]] = {}
+        self._total_length: int = 0
+
+    def split(self, text: str) -> List[str]:
+        """ 按段落切分并合并为不超过 max_chunk_chars 的片段，片段前附带所属的标题
+        """
+        chunks: List[str] = []
+        heading = ""
+        current = ""
+
+        def flush() -> None:
+            nonlocal current
+            body = current.strip()
+            # 只有标题没有正文的片段不单独保留
+            if body and body != heading:
+                chunks.append(body if body.startswith(heading) else f"{heading}\n{body}")
+            current = ""
+
+        for paragraph in re.split(r"\n\s*\n", text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if paragraph.startswith("#"):
+                flush()
+                heading = paragraph.splitlines()[0]
+            if len(current) + len(paragraph) > self.max_chunk_chars and current != heading:
+                flush()
+            while len(paragraph) > self.max_chunk_chars:
+                current = paragraph[:self.max_chunk_chars]
+                flush()
+                paragraph = paragraph[self.max_chunk_chars:]
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+        flush()
+        return chunks
+
+    def add(self, name: str, text: str) -> None:
+        """ 将一个资源加入索引
+        """
+        for chunk_no, chunk in enumerate(self.split(text or "")):
+            chunk_id = len(self.chunks)
+            self.chunks.append((name, chunk_no, estimate_tokens(chunk)))
+            terms = tokenize(chunk)
+            self._lengths.append(len(terms))
+            self._total_length += len(terms)
+            frequencies: Dict[str, int] = {}
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+            for term, frequency in frequencies.items():
+                self._postings.setdefault(term, []).append((chunk_id, frequency))
+
+    def search(
+        self,
+        query: str,
+        top_k: int = RAG_TOP_K,
+        token_budget: int = RAG_TOKEN_BUDGET,
+        min_relative_score: float = 0.3
+    ) -> List[tuple]:
+        """ 返回最相关的片段 [(资源名称, 片段序号, 分数)]，按分数从高到低，总 token 数不超过 token_budget，
+        分数低于最高分 min_relative_score 倍的片段不返回
+        """
+        if not self.chunks:
+            return []
+        total = len(self.chunks)
+        avg_length = self._total_length / total
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        results = []
+        used_tokens = 0
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        for chunk_id, score in ranked:
+            if score < ranked[0][1] * min_relative_score:
+                break
+            name, chunk_no, tokens = self.chunks[chunk_id]
+            if used_tokens + tokens > token_budget:
+                continue
+            results.append((name, chunk_no, score))
+            used_tokens += tokens
+            if len(results) >= top_k:
+                break
+        return results
+
+
 class MCPClient:
     def __init__(
         self,
@@ -30,15 +177,25 @@ class MCPClient:
         self.base_url = base_url
 
         self.session: Optional[ClientSession] = None
+        self.server_params: Optional[StdioServerParameters] = None
+        self._start_lock: asyncio.Lock = asyncio.Lock()
         self.stdio_transport = None
         self.exit_stack = AsyncExitStack()
+        # 连接在专属任务中建立和关闭，避免在其他任务（如并发工具调用）中进入 exit_stack
+        self._connection_task: Optional[asyncio.Task] = None
+        self._stop_event: asyncio.Event = asyncio.Event()
+        self._connected: bool = False
         self._cleanup_lock: asyncio.Lock = asyncio.Lock()
 
         self.available_tools: List[Dict[str, Any]] = []
-        # {resources_name: resources}
-        self.resources_dict = {}
+        # 资源名称列表，内容在后台读取并建立索引，只在有限大小的缓存中保留
+        self.resource_names: List[str] = []
+        self.resource_store = ResourceStore()
         # {promts_name, description}
         self.prompts_dict = {}
+        # 资源片段检索索引，连接后在后台构建
+        self.retriever = ResourceRetriever()
+        self._index_task: Optional[asyncio.Task] = None
 
         self.llm_client = AsyncOpenAI(
             api_key=api_key,
@@ -83,19 +240,171 @@ class MCPClient:
         else:
             raise ValueError("参数数量错误")
 
-    async def connect_to_server(self, server_params: StdioServerParameters):
-        print(f"[SYS]: 正在链接服务器...")
-        self.stdio_transport = await self.exit_stack.enter_async_context(
-            stdio_client(server_params)
+    @staticmethod
+    def _snapshot_key(server_params: StdioServerParameters) -> str:
+        """ 服务器启动命令与参数的内容哈希，参数中的脚本文件同时计入大小与修改时间
+        """
+        files = {}
+        for arg in server_params.args:
+            if os.path.isfile(arg):
+                stat = os.stat(arg)
+                files[arg] = [stat.st_size, stat.st_mtime_ns]
+        raw = json.dumps(
+            {"command": server_params.command, "args": server_params.args, "files": files},
+            sort_keys=True,
+            ensure_ascii=False
         )
-        print(f"[SYS]: 链接成功，正在初始化...")
-        stdio_reader, stdio_writer = self.stdio_transport
-        print(f"[SYS]: 服务器初始化中...")
-        self.session = await self.exit_stack.enter_async_context(
-            ClientSession(stdio_reader, stdio_writer)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _read_snapshots() -> Dict[str, Any]:
+        try:
+            with open(SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _load_snapshot(self) -> bool:
+        """ 从快照加载工具、资源与 Prompt，快照不存在或服务器已变化时返回 False
+        """
+        if not SNAPSHOT_PATH:
+            return False
+        entry = self._read_snapshots().get(self._snapshot_key(self.server_params))
+        if not entry:
+            return False
+        self.available_tools = entry["tools"]
+        self.resource_names = list(entry["resources"])
+        self.prompts_dict = entry["prompts"]
+        return True
+
+    def _save_snapshot(self) -> None:
+        """ 保存当前的工具、资源与 Prompt 到快照
+        """
+        if not SNAPSHOT_PATH:
+            return
+        snapshots = self._read_snapshots()
+        snapshots[self._snapshot_key(self.server_params)] = {
+            "tools": self.available_tools,
+            "resources": self.resource_names,
+            "prompts": self.prompts_dict,
+        }
+        try:
+            os.makedirs(os.path.dirname(SNAPSHOT_PATH) or ".", exist_ok=True)
+            tmp_path = f"{SNAPSHOT_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshots, f, ensure_ascii=False)
+            os.replace(tmp_path, SNAPSHOT_PATH)
+        except OSError as e:
+            print(f"[ERR]: 保存能力快照失败: {e}")
+
+    async def connect_to_server(self, server_params: StdioServerParameters):
+        """ 连接服务器；有可用快照时直接使用快照，服务器在第一次需要时才启动
+        """
+        self.server_params = server_params
+        if self._load_snapshot():
+            print(f"[SYS]: 使用能力快照，服务器将在首次使用时启动\n")
+            print(f"[SYS]: 可用工具: {[t['function']['name'] for t in self.available_tools]}")
+            print(f"[SYS]: 可用资源: {self.resource_names}")
+            print(f"[SYS]: 可用 Prompt: {self.prompts_dict}")
+        else:
+            await self._start_server()
+            # 服务器已启动时立即在后台建立索引；使用快照时推迟到首次检索，避免提前启动服务器
+            if self.resource_names:
+                self._index_task = asyncio.create_task(self._index_resources())
+
+    async def _read_resource(self, name: str) -> str:
+        """ 读取资源内容（优先使用缓存）
+        """
+        text = self.resource_store.get(name)
+        if text is None:
+            session = await self._ensure_session()
+            resource = await session.read_resource(name)
+            text = getattr(resource.contents[0], "text", "") if resource.contents else ""
+            self.resource_store.put(name, text)
+        return text
+
+    async def _index_resources(self) -> None:
+        """ 后台并发读取所有资源并加入检索索引，不阻塞对话
+        """
+        start_time = time.perf_counter()
+        semaphore = asyncio.Semaphore(RESOURCE_READ_CONCURRENCY)
+
+        async def index(name: str) -> None:
+            async with semaphore:
+                try:
+                    self.retriever.add(name, await self._read_resource(name))
+                except Exception as e:
+                    print(f"[ERR]: 读取资源 {name} 失败: {e}")
+
+        await asyncio.gather(*[index(name) for name in self.resource_names])
+        print(
+            f"[SYS]: 资源检索索引完成: {len(self.resource_names)} 个资源，"
+            f"{len(self.retriever.chunks)} 个片段（耗时 {time.perf_counter() - start_time:.2f}s）"
         )
-        print(f"[SYS]: 服务器初始化完成，正在连接...")
-        await self.session.initialize()
+
+    async def _ensure_session(self) -> ClientSession:
+        """ 返回服务器会话，服务器尚未启动时先启动
+        """
+        async with self._start_lock:
+            if self.session is None:
+                await self._start_server()
+        return self.session
+
+    async def _run_connection(self, ready: asyncio.Future) -> None:
+        """ 连接的专属任务：建立连接后等待关闭信号，连接的进入与退出都在该任务中完成
+        """
+        try:
+            async with self.exit_stack:
+                print(f"[SYS]: 正在链接服务器...")
+                self.stdio_transport = await self.exit_stack.enter_async_context(
+                    stdio_client(self.server_params)
+                )
+                print(f"[SYS]: 链接成功，正在初始化...")
+                stdio_reader, stdio_writer = self.stdio_transport
+                print(f"[SYS]: 服务器初始化中...")
+                session = await self.exit_stack.enter_async_context(
+                    ClientSession(stdio_reader, stdio_writer)
+                )
+                print(f"[SYS]: 服务器初始化完成，正在连接...")
+                await session.initialize()
+                self._connected = True
+                if not ready.done():
+                    ready.set_result(session)
+                await self._stop_event.wait()
+        except BaseException as e:
+            if not ready.done():
+                if isinstance(e, asyncio.CancelledError):
+                    ready.cancel()
+                else:
+                    ready.set_exception(e)
+            elif not isinstance(e, asyncio.CancelledError):
+                print(f"[ERR]: 服务器连接异常退出: {e}")
+        finally:
+            self.session = None
+            self.stdio_transport = None
+
+    async def _close_connection(self) -> None:
+        """ 通知专属任务关闭连接并等待其退出
+        """
+        self._stop_event.set()
+        if self._connection_task is not None:
+            # 握手未完成时任务不会等待关闭信号，直接取消
+            if not self._connected:
+                self._connection_task.cancel()
+            await asyncio.gather(self._connection_task, return_exceptions=True)
+        self._connection_task = None
+        self._connected = False
+
+    async def _start_server(self):
+        self._stop_event = asyncio.Event()
+        self._connected = False
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._connection_task = asyncio.create_task(self._run_connection(ready))
+        try:
+            self.session = await ready
+        except BaseException:
+            await self._close_connection()
+            raise
 
         print(f"[SYS]: 服务器链接成功 !!!\n")
 
@@ -114,14 +423,11 @@ class MCPClient:
         ]
         print(f"[SYS]: 可用工具: {[t['function']['name'] for t in self.available_tools]}")
 
-        # 获取资源列表
+        # 获取资源列表（内容在后台读取）
         resources_response = await self.session.list_resources()
-        resources_names = [resource.name for resource in resources_response.resources]
-        for resource_name in resources_names:
-            resource = await self.session.read_resource(resource_name)
-            self.resources_dict[resource_name] = resource.contents[0].text
+        self.resource_names = [resource.name for resource in resources_response.resources]
 
-        print(f"[SYS]: 可用资源: {resources_names}")
+        print(f"[SYS]: 可用资源: {self.resource_names}")
 
         prompts_response = await self.session.list_prompts()
         prompts_names = []
@@ -131,6 +437,7 @@ class MCPClient:
             self.prompts_dict[prompt_name] = prompt.description
         # print(f"[SYS]: 可用 Prompt: {prompts_names}")
         print(f"[SYS]: 可用 Prompt: {self.prompts_dict}")
+        self._save_snapshot()
 
     async def selcect_prompt_template(self, user_question: str) -> str:
         """ 根据用户问题选择 prompt 模板
@@ -161,66 +468,100 @@ class MCPClient:
             else "simply_replay"
         )
     
-    async def add_relevant_resources(self, user_question: str) -> str:
-        """ 根据用户问题添加资源
+    async def add_relevant_resources(self, user_question: str, query: Optional[str] = None) -> str:
+        """ 根据用户问题检索最相关的资源片段（BM25），在 token 预算内附加到问题后
+        :param user_question: 发送给模型的问题（可能已套用提示模板）
+        :param query: 检索用的原始问题，默认与 user_question 相同
         """
-        keywords_map = {
-            "MCP规范协议": ["mcp-doc://4.MCP规范协议.md"],
-            "MCP交互流程": ["mcp-doc://6.MCP核心交互流程.md"],
-            "MCP": ["mcp-doc://4.MCP规范协议.md", "mcp-doc://6.MCP核心交互流程.md"],
-        }
+        if self._index_task is None:
+            # 使用快照启动时在第一次提问时才开始后台建立索引，不等待索引完成
+            self._index_task = asyncio.create_task(self._index_resources())
+        if not self._index_task.done():
+            print("[LOG]: 资源检索索引构建中，使用已完成的部分")
+        matched_chunks = self.retriever.search(query or user_question)
 
-        # 关键字匹配查找
-        matched_resources = []
-        for keyword, resources in keywords_map.items():
-            if keyword in user_question:
-                for resource in resources:
-                    if (
-                        resource in self.resources_dict
-                        and resource not in matched_resources
-                    ):
-                        matched_resources.append(resource)
-        
         # 没有匹配则返回原问题
-        if not matched_resources:
+        if not matched_chunks:
             return user_question
-        
-        # 构建增强的问题
+        print(f"[LOG]: 检索到的资源片段: {[(name, round(score, 2)) for name, _, score in matched_chunks]}")
+
+        # 构建增强的问题（片段文本由资源文本重新切分得到）
         context_parts = []
-        for resource in matched_resources:
-            context_parts.append(f"--- {resource} ---\n{self.resources_dict[resource]}")
+        split_cache: Dict[str, List[str]] = {}
+        for resource, chunk_no, _ in matched_chunks:
+            if resource not in split_cache:
+                split_cache[resource] = self.retriever.split(await self._read_resource(resource))
+            chunks = split_cache[resource]
+            if chunk_no < len(chunks):
+                context_parts.append(f"--- {unquote(resource)} ---\n{chunks[chunk_no]}")
+        if not context_parts:
+            return user_question
 
         return (
             user_question + "\n\n相关信息:\n\n" + "\n\n".join(context_parts)
         )
 
-    async def process_query(self, query: str, messages: List[dict] = None, depth: int = 0) -> str:
-        if depth >= 5:
-            return "[ERR] 超过最大递归深度，请检查工具调用逻辑"
-        
-        # messages = []
-        # messages = messages.copy() if messages else [{"role": "user", "content": query}]
-        
-        if messages:
-            messages = messages.copy()
-        else:
-            user_text = query.strip()
-            # 1.选择 prompt
-            if self.prompts_dict:
-                template_name = await self.selcect_prompt_template(user_text)
-                prompt_response = await self.session.get_prompt(
-                    template_name, 
-                    arguments={"question": user_text}
-                )
-                user_text = prompt_response.messages[0].content.text
-                print(f"[LOG]: 选择的提示模板: {template_name} \n")
+    async def process_query(self, query: str) -> str:
+        """ 处理查询: 迭代执行 模型回答 -> 并发调用本轮所有工具 -> 再次请求模型，
+        直到模型不再调用工具或用完 MAX_TOOL_STEPS 轮
+        """
+        user_text = query.strip()
+        # 1.选择 prompt
+        if self.prompts_dict:
+            template_name = await self.selcect_prompt_template(user_text)
+            session = await self._ensure_session()
+            prompt_response = await session.get_prompt(
+                template_name, 
+                arguments={"question": user_text}
+            )
+            user_text = prompt_response.messages[0].content.text
+            print(f"[LOG]: 选择的提示模板: {template_name} \n")
 
-            # 2.添加相关资源
-            if self.resources_dict:
-                user_text = await self.add_relevant_resources(user_text)
-            
-            messages = [{"role": "user", "content": user_text}]
-        
+        # 2.添加相关资源
+        if self.resource_names:
+            user_text = await self.add_relevant_resources(user_text, query)
+
+        messages = [{"role": "user", "content": user_text}]
+
+        # 3.工具调用循环，每轮的工具调用并发执行，结果一起追加到对话中
+        for _ in range(MAX_TOOL_STEPS):
+            full_response, tool_calls = await self._stream_completion(messages)
+            if not tool_calls:
+                return full_response
+
+            # 构造完整的工具调用参数日志
+            tool_calls_log = [
+                {
+                    "name": call["name"],
+                    "arguments": json.loads(call["arguments"]) if call["arguments"] else {}
+                } 
+                for call in tool_calls
+            ]
+            print(f"[LOG]: 完整工具调用参数: {json.dumps(tool_calls_log, ensure_ascii=False)}")
+
+            # 将工具调用信息添加到messages
+            messages.append({
+                "role": "assistant",
+                "content": full_response or None,
+                "tool_calls": [
+                    {
+                        "type": "function",
+                        "id": call["id"],
+                        "function": {
+                            "name": call["name"],
+                            "arguments": call["arguments"]
+                        }
+                    }
+                    for call in tool_calls
+                ]
+            })
+            messages.extend(await asyncio.gather(*[self._call_tool(call) for call in tool_calls]))
+
+        return f"[ERR] 工具调用超过 {MAX_TOOL_STEPS} 轮，请检查工具调用逻辑"
+
+    async def _stream_completion(self, messages: List[dict]) -> tuple:
+        """ 流式请求模型并打印回答，返回 (回答文本, 工具调用列表)
+        """
         full_response = ""
         tool_calls_cache = {}
 
@@ -267,60 +608,33 @@ class MCPClient:
                     cached["arguments"] += tool_call.function.arguments or ""
 
         print("\n")  # 流式输出结束后换行
+        return full_response, [tool_calls_cache[index] for index in sorted(tool_calls_cache)]
 
-        # 处理工具调用逻辑
-        if tool_calls_cache:
-            # 构造完整的工具调用参数日志
-            tool_calls_log = [
-                {
-                    "name": call["name"],
-                    "arguments": json.loads(call["arguments"]) if call["arguments"] else {}
-                } 
-                for call in tool_calls_cache.values()
-            ]
-            print(f"[LOG]: 完整工具调用参数: {json.dumps(tool_calls_log, ensure_ascii=False)}")
-
-            # 将工具调用信息添加到messages
-            messages.append({
-                "role": "assistant",
-                "content": None,
-                "tool_calls": [
-                    {
-                        "type": "function",
-                        "id": call["id"],
-                        "function": {
-                            "name": call["name"],
-                            "arguments": call["arguments"]
-                        }
-                    }
-                    for call in tool_calls_cache.values()
-                ]
-            })
-
-            # 执行工具调用并递归处理
-            for tool_call in tool_calls_cache.values():
-                tool_name = tool_call["name"]
-                try:
-                    tool_args = json.loads(tool_call["arguments"])
-                except json.JSONDecodeError:
-                    tool_args = {"input": tool_call["arguments"]}
-
-                result = await self.session.call_tool(tool_name, tool_args)
-                print(f"[LOG]: 调用结果: {result.model_dump()}")
-                print(f"[LOG]: 调用工具 [{tool_name}] 参数: {tool_args}")
-                print(f"[LOG]: 工具响应: {result.content}\n")
-
-                messages.append({
-                    "role": "tool",
-                    # "content": getattr(result.content, 'text', str(result.content)),
-                    "content": result.model_dump()["content"],
-                    "tool_call_id": tool_call["id"],
-                    "name": tool_name
-                })
-
-                return await self.process_query(query, messages, depth + 1)
-
-        return full_response
+    async def _call_tool(self, tool_call: Dict[str, str]) -> dict:
+        """ 调用一个工具，返回追加到对话中的 tool 消息（调用失败时内容为错误信息）
+        """
+        tool_name = tool_call["name"]
+        try:
+            tool_args = json.loads(tool_call["arguments"]) if tool_call["arguments"] else {}
+        except json.JSONDecodeError:
+            tool_args = {"input": tool_call["arguments"]}
+
+        print(f"[LOG]: 调用工具 [{tool_name}] 参数: {tool_args}")
+        try:
+            session = await self._ensure_session()
+            result = await session.call_tool(tool_name, tool_args)
+            content = result.model_dump()["content"]
+            print(f"[LOG]: 工具 [{tool_name}] 响应: {result.content}\n")
+        except Exception as e:
+            content = f"[ERR] 调用工具 {tool_name} 失败: {e}"
+            print(f"[ERR]: 调用工具 [{tool_name}] 失败: {e}\n")
+
+        return {
+            "role": "tool",
+            "content": content,
+            "tool_call_id": tool_call["id"],
+            "name": tool_name
+        }
 
     async def chat_loop(self):
         print("[SYS]: MCP客户端已启动！")
@@ -354,12 +668,10 @@ class MCPClient:
 
     async def cleanup(self):
         async with self._cleanup_lock:
-            try:
-                await self.exit_stack.aclose()
-                self.session = None
-                self.stdio_context = None
-            except Exception as e:
-                print(f"Error during cleanup of server: {e}")
+            if self._index_task is not None:
+                self._index_task.cancel()
+                await asyncio.gather(self._index_task, return_exceptions=True)
+            await self._close_connection()
 
 async def main():
     try:
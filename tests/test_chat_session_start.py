@@ -0,0 +1,40 @@
+import asyncio
+import sys
+from pathlib import Path
+
+from mcp_chatbot import ChatSession, MCPClient
+
+TIME_SERVICE = Path(__file__).resolve().parent.parent / "services" / "time_service.py"
+
+
+def test_shared_idle_stopped_client_starts_once():
+    client = MCPClient("time", {
+        "command": sys.executable,
+        "args": [str(TIME_SERVICE)],
+        "idleTimeout": 1,
+        "healthCheck": {"interval": 0},
+    })
+
+    async def main():
+        await client.initialize()
+        try:
+            await client.list_tools()
+            async with asyncio.timeout(10):
+                while client.session is not None:
+                    await asyncio.sleep(0.1)
+            generation = client.generation
+
+            sessions = [ChatSession([client], llm_service=None, owns_clients=False) for _ in range(3)]
+            assert all(await asyncio.gather(*[session.initialize() for session in sessions]))
+            # 已知工具列表时初始化会话不启动进程
+            assert client.session is None
+            assert client.generation == generation
+
+            await asyncio.gather(*[
+                client.execute_tool("get_current_time", {}) for _ in range(3)
+            ])
+            return client.generation - generation
+        finally:
+            await client.cleanup()
+
+    assert asyncio.run(main()) == 1
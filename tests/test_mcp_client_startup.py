@@ -0,0 +1,52 @@
+import asyncio
+import sys
+import time
+
+from mcp_chatbot import ChatSession, MCPClient
+
+# 读取请求但从不响应 initialize 的服务器
+NEVER_INITIALIZES = """
+import sys, time
+for line in sys.stdin:
+    pass
+time.sleep(3600)
+"""
+
+
+def never_initializing_client(tmp_path, **config) -> MCPClient:
+    script = tmp_path / "never_init_server.py"
+    script.write_text(NEVER_INITIALIZES)
+    return MCPClient("hang", {
+        "command": sys.executable,
+        "args": [str(script)],
+        "healthCheck": {"interval": 0},
+        **config,
+    })
+
+
+def test_chat_session_startup_timeout_on_hung_handshake(tmp_path):
+    client = never_initializing_client(tmp_path)
+    session = ChatSession([client], llm_service=None, startup_timeout=1)
+
+    start = time.perf_counter()
+    assert asyncio.run(session.initialize()) is False
+    assert time.perf_counter() - start < 3
+    assert client._connection_task is None
+
+
+def test_ensure_started_timeout_on_hung_handshake(tmp_path):
+    client = never_initializing_client(tmp_path, startupTimeout=1)
+
+    async def main():
+        for _ in range(2):
+            try:
+                await client._ensure_started()
+            except TimeoutError:
+                pass
+            else:
+                raise AssertionError("startup should time out")
+        return client._connection_task
+
+    start = time.perf_counter()
+    assert asyncio.run(main()) is None
+    assert time.perf_counter() - start < 5
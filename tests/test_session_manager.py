@@ -0,0 +1,33 @@
+import asyncio
+import sys
+from pathlib import Path
+
+from mcp_chatbot import AdmissionError, MCPClient, SessionManager
+
+TIME_SERVICE = Path(__file__).resolve().parent.parent / "services" / "time_service.py"
+
+
+def test_concurrent_create_session_respects_max_sessions():
+    client = MCPClient("time", {
+        "command": sys.executable,
+        "args": [str(TIME_SERVICE)],
+        "healthCheck": {"interval": 0},
+    })
+    manager = SessionManager([client], llm_service=None, max_sessions=2, session_idle_timeout=0)
+
+    async def main():
+        await manager.start()
+        try:
+            return await asyncio.gather(
+                *[manager.create_session() for _ in range(10)],
+                return_exceptions=True
+            )
+        finally:
+            await manager.stop()
+
+    results = asyncio.run(main())
+    created = [r for r in results if isinstance(r, str)]
+    rejected = [r for r in results if isinstance(r, AdmissionError)]
+    assert len(created) == 2
+    assert len(rejected) == 8
+    assert manager.stats["rejected"] == 8
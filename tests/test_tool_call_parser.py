@@ -0,0 +1,43 @@
+from mcp_chatbot.chat.tool_call_parser import ToolCallStreamParser, extract_tool_calls
+
+UNCLOSED_THEN_CALL = 'Use {"a": 1 oops. Then {"tool":"t","arguments":{}}'
+TOOL_CALL = {"tool": "t", "arguments": {}}
+
+
+def stream(text: str, chunk_size: int = 1):
+    parser = ToolCallStreamParser()
+    texts, tool_calls = [], []
+    for i in range(0, len(text), chunk_size):
+        chunk_text, chunk_calls = parser.feed(text[i:i + chunk_size])
+        texts.append(chunk_text)
+        tool_calls.extend(chunk_calls)
+    texts.append(parser.flush())
+    return "".join(texts), tool_calls
+
+
+def test_extract_after_unclosed_object():
+    assert extract_tool_calls(UNCLOSED_THEN_CALL) == [TOOL_CALL]
+
+
+def test_extract_after_unparsable_object():
+    assert extract_tool_calls('{"a": 1, {"tool":"t","arguments":{}}}') == [TOOL_CALL]
+
+
+def test_stream_after_unclosed_object():
+    for chunk_size in (1, 5, len(UNCLOSED_THEN_CALL)):
+        text, tool_calls = stream(UNCLOSED_THEN_CALL, chunk_size)
+        assert tool_calls == [TOOL_CALL]
+        assert text == "Use {\"a\": 1 oops. Then "
+
+
+def test_stream_emits_text_of_unclosed_object_before_flush():
+    parser = ToolCallStreamParser()
+    text, tool_calls = parser.feed('Use {"a": 1 oops, still talking')
+    assert text == 'Use {"a": 1 oops, still talking'
+    assert tool_calls == []
+
+
+def test_stream_fenced_tool_call():
+    text, tool_calls = stream('好的\n```json\n{"tool": "t", "arguments": {"q": "} {"}}\n```\n完成')
+    assert tool_calls == [{"tool": "t", "arguments": {"q": "} {"}}]
+    assert text == "好的\n\n完成"